@@ -0,0 +1,470 @@
+"""
+In-process BC1/BC3 (DXT1/DXT5) block compression and DDS container writing.
+
+The image is cut into 4x4 blocks with reshapes, a band of block rows at a
+time, and every block is encoded with array maths, so no Python code runs
+per block or per pixel and temporaries stay bounded for any image size.
+"""
+import struct
+import numpy as np
+
+# --- DDS CONSTANTS ---
+DDSD_CAPS, DDSD_HEIGHT, DDSD_WIDTH, DDSD_PITCH = 0x1, 0x2, 0x4, 0x8
+DDSD_PIXELFORMAT, DDSD_MIPMAPCOUNT, DDSD_LINEARSIZE = 0x1000, 0x20000, 0x80000
+DDPF_ALPHAPIXELS, DDPF_FOURCC, DDPF_RGB = 0x1, 0x4, 0x40
+DDSCAPS_COMPLEX, DDSCAPS_TEXTURE, DDSCAPS_MIPMAP = 0x8, 0x1000, 0x400000
+
+# Bytes per 4x4 block for each block-compressed FourCC
+BLOCK_BYTES = {b"DXT1": 8, b"DXT5": 16}
+
+# Blocks encoded per NumPy pass. Bounds the temporary (blocks, 16, 4, 3)
+# distance arrays to a few tens of MB regardless of image size.
+CHUNK_BLOCKS = 16384
+
+def pick_format(compress, has_alpha):
+    """Maps the UI compression choice to a FourCC, or None for uncompressed BGRA."""
+    if compress == "Auto":
+        return b"DXT5" if has_alpha else b"DXT1"
+    if compress == "DXT1":
+        return b"DXT1"
+    if compress == "DXT5":
+        return b"DXT5"
+    return None
+
+def level_size(fourcc, w, h):
+    """Bytes one mip level of the given format occupies in a DDS file."""
+    if fourcc is None:
+        return w * h * 4
+    return max(1, (w + 3) // 4) * max(1, (h + 3) // 4) * BLOCK_BYTES[fourcc]
+
+# --- BLOCK LAYOUT ---
+def to_blocks(rgba):
+    """(H, W, 4) uint8 -> (N, 16, 4) blocks in DDS order, edge-padding to a multiple of 4."""
+    h, w = rgba.shape[:2]
+    ph, pw = (-h) % 4, (-w) % 4
+    if ph or pw:
+        rgba = np.pad(rgba, ((0, ph), (0, pw), (0, 0)), mode="edge")
+    bh, bw = rgba.shape[0] // 4, rgba.shape[1] // 4
+    return rgba.reshape(bh, 4, bw, 4, 4).transpose(0, 2, 1, 3, 4).reshape(bh * bw, 16, 4)
+
+# --- COLOUR (BC1) ---
+def _pack565(rgb):
+    q = np.rint(rgb * np.array([31 / 255, 63 / 255, 31 / 255], dtype=np.float32))
+    q = q.astype(np.uint16)
+    return (q[..., 0] << 11) | (q[..., 1] << 5) | q[..., 2]
+
+def _unpack565(c):
+    r = (c >> 11) & 31
+    g = (c >> 5) & 63
+    b = c & 31
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=-1).astype(np.float32)
+
+def _principal_endpoints(rgb, weight=None):
+    """Endpoints at the extremes of each block's principal colour axis, ignoring pixels with weight 0."""
+    if weight is None:
+        mean = rgb.mean(1)
+        lo_box, hi_box = rgb.min(1), rgb.max(1)
+    else:
+        wsum = np.maximum(weight.sum(1), 1e-6)
+        mean = np.einsum("nk,nkc->nc", weight, rgb) / wsum[:, None]
+        lo_box = np.where(weight[..., None] > 0, rgb, 255).min(1)
+        hi_box = np.where(weight[..., None] > 0, rgb, 0).max(1)
+    d = rgb - mean[:, None, :]
+    wd = d if weight is None else d * weight[..., None]
+    cov = np.einsum("nki,nkj->nij", wd, wd)
+    # Power iteration, seeded with the bounding-box diagonal
+    axis = hi_box - lo_box + 1e-3
+    for _ in range(4):
+        axis = np.einsum("nij,nj->ni", cov, axis)
+        axis /= np.maximum(np.sqrt((axis * axis).sum(1, keepdims=True)), 1e-6)
+    proj = np.einsum("nkc,nc->nk", d, axis)
+    if weight is None:
+        pmin, pmax = proj.min(1), proj.max(1)
+    else:
+        pmin = np.where(weight > 0, proj, np.inf).min(1)
+        pmax = np.where(weight > 0, proj, -np.inf).max(1)
+        # Fully transparent blocks have no colour to fit
+        pmin[~np.isfinite(pmin)] = 0
+        pmax[~np.isfinite(pmax)] = 0
+    lo = np.clip(mean + axis * pmin[:, None], 0, 255)
+    hi = np.clip(mean + axis * pmax[:, None], 0, 255)
+    return hi, lo
+
+def _palette4(e0, e1):
+    return np.stack([e0, e1, (2 * e0 + e1) / 3, (e0 + 2 * e1) / 3], axis=1)
+
+# Position along the c0 -> c1 segment (in thirds / halves) -> BC1 index
+_STEP_TO_INDEX4 = np.array([0, 2, 3, 1])
+_STEP_TO_INDEX3 = np.array([0, 2, 1])
+
+def _fit_indices(rgb, e0, e1, steps):
+    """Snaps every pixel's projection onto the e0 -> e1 segment to the nearest palette step."""
+    d = e1 - e0
+    dd = np.maximum((d * d).sum(-1), 1e-6)
+    t = np.einsum("nkc,nc->nk", rgb - e0[:, None, :], d) / dd[:, None]
+    q = np.clip(np.rint(t * steps), 0, steps).astype(np.intp)
+    return (_STEP_TO_INDEX4 if steps == 3 else _STEP_TO_INDEX3)[q]
+
+def _block_error(rgb, pal, idx):
+    recon = pal[np.arange(pal.shape[0])[:, None], idx]
+    return ((rgb - recon) ** 2).sum((1, 2))
+
+def _refine(rgb, idx):
+    """Least-squares endpoints for a fixed 4-colour index assignment."""
+    a = np.array([1, 0, 2 / 3, 1 / 3], dtype=np.float32)[idx]
+    b = 1 - a
+    aa, bb, ab = (a * a).sum(1), (b * b).sum(1), (a * b).sum(1)
+    ax = np.einsum("nk,nkc->nc", a, rgb)
+    bx = np.einsum("nk,nkc->nc", b, rgb)
+    det = aa * bb - ab * ab
+    ok = np.abs(det) > 1e-6
+    det = np.where(ok, det, 1)[:, None]
+    e0 = np.clip((bb[:, None] * ax - ab[:, None] * bx) / det, 0, 255)
+    e1 = np.clip((aa[:, None] * bx - ab[:, None] * ax) / det, 0, 255)
+    return e0, e1, ok
+
+def _encode_color(rgb, transparent=None):
+    """
+    Encodes (N, 16, 3) float pixels to (c0, c1, indices) BC1 colour blocks.
+    Blocks with any `transparent` pixel use the 3-colour + transparent mode.
+    """
+    n = rgb.shape[0]
+    if transparent is None or not transparent.any():
+        transparent = np.zeros((n, 16), dtype=bool)
+        hi, lo = _principal_endpoints(rgb)
+    else:
+        hi, lo = _principal_endpoints(rgb, (~transparent).astype(np.float32))
+    punch = transparent.any(1)
+    c0, c1 = _pack565(hi), _pack565(lo)
+
+    # 4-colour mode needs c0 > c1, 3-colour mode needs c0 <= c1
+    swap = np.where(punch, c0 > c1, c0 < c1)
+    c0, c1 = np.where(swap, c1, c0), np.where(swap, c0, c1)
+
+    e0, e1 = _unpack565(c0), _unpack565(c1)
+    idx = _fit_indices(rgb, e0, e1, 3)
+    err = _block_error(rgb, _palette4(e0, e1), idx)
+
+    # One least-squares pass over the opaque blocks, kept only where it helps
+    r0, r1, ok = _refine(rgb, idx)
+    rc0, rc1 = _pack565(r0), _pack565(r1)
+    rswap = rc0 < rc1
+    rc0, rc1 = np.where(rswap, rc1, rc0), np.where(rswap, rc0, rc1)
+    re0, re1 = _unpack565(rc0), _unpack565(rc1)
+    ridx = _fit_indices(rgb, re0, re1, 3)
+    rerr = _block_error(rgb, _palette4(re0, re1), ridx)
+    better = ok & ~punch & (rerr < err) & (rc0 != rc1)
+    c0, c1 = np.where(better, rc0, c0), np.where(better, rc1, c1)
+    idx = np.where(better[:, None], ridx, idx)
+
+    # Equal endpoints in 4-colour mode would flip the block into 3-colour mode
+    flat = ~punch & (c0 == c1)
+    idx[flat] = 0
+
+    if punch.any():
+        pidx = _fit_indices(rgb[punch], _unpack565(c0[punch]), _unpack565(c1[punch]), 2)
+        pidx[transparent[punch]] = 3
+        idx[punch] = pidx
+
+    return c0, c1, _pack_indices(idx, 2).astype(np.uint32)
+
+def _pack_indices(idx, bits):
+    shifts = np.arange(16, dtype=np.uint64) * bits
+    return (idx.astype(np.uint64) << shifts).sum(1, dtype=np.uint64)
+
+# --- ALPHA (BC3) ---
+_STEP_TO_ALPHA_INDEX = np.array([0, 2, 3, 4, 5, 6, 7, 1])
+
+def _encode_alpha(alpha):
+    """Encodes (N, 16) float alpha to 8-byte BC3 alpha blocks (8-value interpolation)."""
+    a0 = alpha.max(1)
+    a1 = alpha.min(1)
+    span = np.maximum(a0 - a1, 1e-6)
+    # Steps run from a0 (0) to a1 (7) in sevenths
+    q = np.clip(np.rint((a0[:, None] - alpha) * 7 / span[:, None]), 0, 7).astype(np.intp)
+    bits = _pack_indices(_STEP_TO_ALPHA_INDEX[q], 3)
+    out = np.empty((alpha.shape[0], 8), dtype=np.uint8)
+    out[:, 0] = a0.astype(np.uint8)
+    out[:, 1] = a1.astype(np.uint8)
+    out[:, 2:] = bits[:, None].view(np.uint8).reshape(-1, 8)[:, :6]
+    return out
+
+# --- PUBLIC ENCODERS ---
+def encode_bc1(rgba, alpha_cutoff=128):
+    """RGBA uint8 (H, W, 4) -> DXT1 block data. Pixels under alpha_cutoff become transparent."""
+    return _encode(rgba, b"DXT1", alpha_cutoff)
+
+def encode_bc3(rgba):
+    """RGBA uint8 (H, W, 4) -> DXT5 block data."""
+    return _encode(rgba, b"DXT5", None)
+
+def _iter_block_chunks(rgba):
+    """
+    Yields the image's blocks in DDS order, about CHUNK_BLOCKS at a time.
+    Blocks are cut from bands of whole block rows, so the image is never
+    copied into block order in one piece.
+    """
+    rgba = np.asarray(rgba, dtype=np.uint8)
+    h, w = rgba.shape[:2]
+    band = 4 * max(1, CHUNK_BLOCKS // max(1, (w + 3) // 4))
+    for y in range(0, max(h, 1), band):
+        yield to_blocks(rgba[y:y + band])
+
+def _encode(rgba, fourcc, alpha_cutoff):
+    parts = []
+    for blocks in _iter_block_chunks(rgba):
+        chunk = blocks.astype(np.float32)
+        rgb = chunk[..., :3]
+        n = chunk.shape[0]
+        if fourcc == b"DXT1":
+            transparent = chunk[..., 3] < alpha_cutoff if alpha_cutoff else None
+            c0, c1, idx = _encode_color(rgb, transparent)
+            out = np.empty(n, dtype=[("c0", "<u2"), ("c1", "<u2"), ("idx", "<u4")])
+        else:
+            c0, c1, idx = _encode_color(rgb)
+            out = np.empty(n, dtype=[("alpha", "u1", 8), ("c0", "<u2"), ("c1", "<u2"), ("idx", "<u4")])
+            out["alpha"] = _encode_alpha(chunk[..., 3])
+        out["c0"], out["c1"], out["idx"] = c0, c1, idx
+        parts.append(out.tobytes())
+    return b"".join(parts)
+
+def encode_level(rgba, fourcc):
+    """Encodes one mip level in the given format (None = uncompressed BGRA)."""
+    if fourcc == b"DXT1":
+        return encode_bc1(rgba)
+    if fourcc == b"DXT5":
+        return encode_bc3(rgba)
+    return np.ascontiguousarray(rgba[..., [2, 1, 0, 3]]).tobytes()
+
+# --- DECODERS ---
+_BC1_BLOCK = np.dtype([("c0", "<u2"), ("c1", "<u2"), ("idx", "<u4")])
+_BC3_BLOCK = np.dtype([("alpha", "u1", 8), ("c0", "<u2"), ("c1", "<u2"), ("idx", "<u4")])
+
+def from_blocks(pixels, w, h):
+    """(N, 16, 4) blocks in DDS order -> (H, W, 4) image, cropping the 4x4 padding."""
+    bw, bh = max(1, (w + 3) // 4), max(1, (h + 3) // 4)
+    img = pixels.reshape(bh, bw, 4, 4, 4).transpose(0, 2, 1, 3, 4).reshape(bh * 4, bw * 4, 4)
+    return img[:h, :w]
+
+def _unpack_indices(bits, width):
+    shifts = np.arange(16, dtype=np.uint64) * width
+    return ((bits.astype(np.uint64)[:, None] >> shifts) & ((1 << width) - 1)).astype(np.intp)
+
+def _decode_color(blocks, allow_punch):
+    """Colour palettes for BC1/BC3 colour blocks -> (N, 16, 4) RGBA pixels."""
+    c0, c1 = blocks["c0"], blocks["c1"]
+    e0 = _unpack565(c0).astype(np.int32)
+    e1 = _unpack565(c1).astype(np.int32)
+    n = e0.shape[0]
+    pal = np.empty((n, 4, 4), dtype=np.int32)
+    pal[:, :, 3] = 255
+    pal[:, 0, :3], pal[:, 1, :3] = e0, e1
+    pal[:, 2, :3] = (2 * e0 + e1) // 3
+    pal[:, 3, :3] = (e0 + 2 * e1) // 3
+    if allow_punch:
+        # BC1 with c0 <= c1: 3 colours plus transparent black
+        three = c0 <= c1
+        pal[three, 2, :3] = (e0[three] + e1[three]) // 2
+        pal[three, 3] = 0
+    idx = _unpack_indices(blocks["idx"], 2)
+    return pal[np.arange(n)[:, None], idx].astype(np.uint8)
+
+def _decode_alpha(raw):
+    """(N, 8) BC3 alpha blocks -> (N, 16) alpha values."""
+    a0 = raw[:, 0].astype(np.int32)
+    a1 = raw[:, 1].astype(np.int32)
+    bits = np.zeros((raw.shape[0], 8), dtype=np.uint8)
+    bits[:, :6] = raw[:, 2:]
+    bits = bits.view("<u8")[:, 0]
+    k = np.arange(1, 7, dtype=np.int32)
+    pal = np.empty((raw.shape[0], 8), dtype=np.int32)
+    pal[:, 0], pal[:, 1] = a0, a1
+    # a0 > a1: six interpolated values; otherwise four plus explicit 0 and 255
+    eight = (a0 > a1)[:, None]
+    interp8 = ((7 - k) * a0[:, None] + k * a1[:, None]) // 7
+    k4 = np.array([1, 2, 3, 4, 0, 0], dtype=np.int32)
+    interp6 = ((5 - k4) * a0[:, None] + k4 * a1[:, None]) // 5
+    interp6[:, 4], interp6[:, 5] = 0, 255
+    pal[:, 2:] = np.where(eight, interp8, interp6)
+    idx = _unpack_indices(bits, 3)
+    return np.take_along_axis(pal, idx, 1).astype(np.uint8)
+
+def decode_bc1(data, w, h):
+    """DXT1 block data -> (H, W, 4) uint8 RGBA, including 1-bit alpha blocks."""
+    nb = max(1, (w + 3) // 4) * max(1, (h + 3) // 4)
+    blocks = np.frombuffer(data, dtype=_BC1_BLOCK, count=nb)
+    return from_blocks(_decode_color(blocks, True), w, h)
+
+def decode_bc3(data, w, h):
+    """DXT5 block data -> (H, W, 4) uint8 RGBA."""
+    nb = max(1, (w + 3) // 4) * max(1, (h + 3) // 4)
+    blocks = np.frombuffer(data, dtype=_BC3_BLOCK, count=nb)
+    pixels = _decode_color(blocks, False)
+    pixels[..., 3] = _decode_alpha(blocks["alpha"])
+    return from_blocks(pixels, w, h)
+
+def decode_level(data, fourcc, w, h):
+    """Decodes one mip level in the given format (None = uncompressed BGRA)."""
+    if fourcc == b"DXT1":
+        return decode_bc1(data, w, h)
+    if fourcc == b"DXT5":
+        return decode_bc3(data, w, h)
+    bgra = np.frombuffer(data, dtype=np.uint8, count=w * h * 4).reshape(h, w, 4)
+    return bgra[..., [2, 1, 0, 3]]
+
+# --- MIPMAPS ---
+# Alpha-test reference the coverage-preserving mips aim to keep stable (0.5)
+ALPHA_TEST_REF = 128
+
+def _even(level):
+    """Drops the last row/column of an odd-sized axis, so halving rounds down as DDS mip sizes do."""
+    h, w = level.shape[:2]
+    return level[:h - h % 2 if h > 1 else h, :w - w % 2 if w > 1 else w]
+
+def _box_reduce(level):
+    """Halves a float (H, W, 4) level with a 2x2 box filter; a 1-pixel axis is left alone."""
+    level = _even(level)
+    h, w = level.shape[:2]
+    if h > 1:
+        level = level.reshape(h // 2, 2, w, 4).mean(1)
+    if w > 1:
+        level = level.reshape(level.shape[0], w // 2, 2, 4).mean(2)
+    return level
+
+def _coverage(alpha, ref=ALPHA_TEST_REF):
+    return float((alpha >= ref).mean())
+
+def _scale_to_coverage(alpha, target, ref=ALPHA_TEST_REF):
+    """Scales alpha so the fraction of pixels passing the alpha test is as close to `target` as ties allow."""
+    if target <= 0 or target >= 1:
+        return alpha
+    # The pixel at the (1 - target) quantile should land exactly on ref. With
+    # repeated alpha values that can overshoot, so also try the next distinct value up.
+    q = np.quantile(alpha, 1 - target)
+    above = alpha[alpha > q]
+    candidates = [1.0]
+    for v in (q, above.min() if above.size else 0):
+        if v > 0:
+            candidates.append(ref / v)
+    best = min(candidates, key=lambda s: abs(_coverage(np.minimum(alpha * s, 255), ref) - target))
+    return np.minimum(alpha * best, 255)
+
+def _reduce_source(rgba):
+    """First mip level as float32, converting the uint8 source a band of rows at a time."""
+    rgba = _even(rgba)
+    h, w = rgba.shape[:2]
+    if h == 1 or w == 1:
+        return _box_reduce(rgba.astype(np.float32))
+    band = max(2, (CHUNK_BLOCKS * 16 // w) & ~1)
+    return np.concatenate([_box_reduce(rgba[y:y + band].astype(np.float32))
+                           for y in range(0, h, band)], axis=0)
+
+def mip_count(w, h):
+    """Levels in a full chain down to 1x1; level i is max(1, w >> i) x max(1, h >> i)."""
+    return max(w, h, 1).bit_length()
+
+def iter_mip_chain(rgba, alpha_coverage=False):
+    """
+    Yields the full mip chain (largest first, down to 1x1) of an (H, W, 4)
+    uint8 image as uint8 levels. Each level is box-filtered from the previous
+    one in float32, so rounding error doesn't accumulate; only the level being
+    reduced is kept in float, never the full-size source. With alpha_coverage
+    the alpha of each level is rescaled so cutout edges don't erode with distance.
+    """
+    rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+    yield rgba
+    target = _coverage(rgba[..., 3]) if alpha_coverage else None
+    level, shape = None, rgba.shape
+    while shape[0] > 1 or shape[1] > 1:
+        level = _reduce_source(rgba) if level is None else _box_reduce(level)
+        shape = level.shape
+        out = level
+        if target is not None:
+            out = level.copy()
+            out[..., 3] = _scale_to_coverage(level[..., 3], target)
+        yield np.clip(np.rint(out), 0, 255).astype(np.uint8)
+
+def build_mip_chain(rgba, alpha_coverage=False):
+    """The whole of iter_mip_chain as a list."""
+    return list(iter_mip_chain(rgba, alpha_coverage))
+
+# --- DDS CONTAINER ---
+def dds_header(w, h, fourcc, mip_count):
+    """The 128-byte 'DDS ' magic + DDS_HEADER for a 2D texture."""
+    flags = DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PIXELFORMAT
+    caps = DDSCAPS_TEXTURE
+    if mip_count > 1:
+        flags |= DDSD_MIPMAPCOUNT
+        caps |= DDSCAPS_COMPLEX | DDSCAPS_MIPMAP
+    if fourcc is None:
+        flags |= DDSD_PITCH
+        pitch = w * 4
+        pf = struct.pack("<II4sIIIII", 32, DDPF_RGB | DDPF_ALPHAPIXELS, b"\0\0\0\0", 32,
+                         0x00FF0000, 0x0000FF00, 0x000000FF, 0xFF000000)
+    else:
+        flags |= DDSD_LINEARSIZE
+        pitch = level_size(fourcc, w, h)
+        pf = struct.pack("<II4sIIIII", 32, DDPF_FOURCC, fourcc, 0, 0, 0, 0, 0)
+    return (b"DDS " +
+            struct.pack("<IIIIIII 11I", 124, flags, h, w, pitch, 0, mip_count, *[0] * 11) +
+            pf +
+            struct.pack("<IIII I", caps, 0, 0, 0, 0))
+
+def write_dds(out_path, w, h, fourcc, levels):
+    """Writes already-encoded mip levels (largest first) to a DDS file."""
+    with open(out_path, "wb") as f:
+        f.write(dds_header(w, h, fourcc, len(levels)))
+        for data in levels:
+            f.write(data)
+
+def save_dds(img, out_path, fourcc, mips=True, alpha_coverage=False):
+    """
+    Encodes a PIL image (and optionally its mip chain) and writes it as DDS.
+    Levels are written as they are encoded, so only one is held at a time.
+    """
+    rgba = np.asarray(img if img.mode == "RGBA" else img.convert("RGBA"))
+    h, w = rgba.shape[:2]
+    with open(out_path, "wb") as f:
+        f.write(dds_header(w, h, fourcc, mip_count(w, h) if mips else 1))
+        for level in (iter_mip_chain(rgba, alpha_coverage) if mips else [rgba]):
+            f.write(encode_level(level, fourcc))
+
+# --- DDS READER ---
+def read_dds_header(f):
+    """
+    (w, h, fourcc, mip_count) from an open DDS file, or None if it isn't a
+    format this codec decodes (DXT1, DXT5 or 32-bit BGRA, fourcc None).
+    """
+    head = f.read(128)
+    if len(head) < 128 or head[:4] != b"DDS ":
+        return None
+    _, flags, h, w, _, _, mips = struct.unpack_from("<7I", head, 4)
+    _, pf_flags, fourcc, bits, rmask, gmask, bmask, amask = struct.unpack_from("<II4s5I", head, 76)
+    mips = max(1, mips) if flags & DDSD_MIPMAPCOUNT else 1
+    if pf_flags & DDPF_FOURCC:
+        return (w, h, fourcc, mips) if fourcc in BLOCK_BYTES else None
+    if bits == 32 and (rmask, gmask, bmask, amask) == (0x00FF0000, 0x0000FF00, 0x000000FF, 0xFF000000):
+        return w, h, None, mips
+    return None
+
+def read_dds_levels(path, first=0):
+    """
+    (w, h, fourcc, levels): the header facts and the raw bytes of every stored
+    mip from `first` down, largest first. Earlier levels are skipped with a
+    seek, so reading a small mip never touches the large ones. A truncated
+    chain is cut at the last complete level. None for unsupported variants.
+    """
+    with open(path, "rb") as f:
+        header = read_dds_header(f)
+        if header is None:
+            return None
+        w, h, fourcc, mips = header
+        f.seek(sum(level_size(fourcc, max(1, w >> i), max(1, h >> i)) for i in range(first)), 1)
+        levels = []
+        for i in range(first, mips):
+            size = level_size(fourcc, max(1, w >> i), max(1, h >> i))
+            data = f.read(size)
+            if len(data) < size:
+                break
+            levels.append(data)
+    return w, h, fourcc, levels
@@ -0,0 +1,1720 @@
+"""
+Headless conversion engine for the BZR Texture Manager.
+
+Every converter here takes a plain, immutable options object that the GUI
+captures once per batch, so the engine never touches Tk and can be imported
+by worker processes, scripts or build machines.
+"""
+import os, struct, math, sys, subprocess, re, shutil, tempfile, itertools, json, hashlib, fnmatch, threading, time, queue
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from functools import lru_cache
+from dataclasses import dataclass, field, replace, asdict
+from ctypes import Structure, c_int, c_ubyte
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+import numpy as np
+import dds_codec
+
+class DXTBZ2Header(Structure):
+    _fields_ = [
+        ("m_Sig", c_int), ("m_DXTLevel", c_int),
+        ("m_1x1Red", c_ubyte), ("m_1x1Green", c_ubyte),
+        ("m_1x1Blue", c_ubyte), ("m_1x1Alpha", c_ubyte),
+        ("m_NumMips", c_int), ("m_BaseHeight", c_int), ("m_BaseWidth", c_int)
+    ]
+
+# Bump whenever a converter's output bytes change for the same input and
+# options, so incremental builds don't keep stale files.
+ENGINE_VERSION = 4
+
+# --- BZ98 ENGINE CONSTANTS ---
+ZONE_RES = 256  # Redux Standard (256x256 per zone)
+
+class BZMapFormat:
+    INDEXED, ARGB4444, RGB565, ARGB8888, XRGB8888 = 0, 1, 2, 3, 4
+    bpp = [1, 2, 2, 4, 4]
+    names = ["Indexed", "ARGB4444", "RGB565", "ARGB8888", "XRGB8888"]
+
+# Full 256-color Moon.act data extracted from BZ98R Toolkit
+BUILTIN_MOON_PALETTE = [
+    (0, 0, 0), (17, 16, 16), (26, 24, 24), (31, 26, 25), (36, 35, 31), (50, 42, 36),
+    (52, 49, 48), (60, 56, 56), (68, 64, 64), (77, 72, 72), (85, 80, 80), (84, 79, 76),
+    (112, 108, 104), (116, 129, 125), (133, 138, 133), (178, 174, 174), (191, 188, 188),
+    (204, 201, 201), (217, 215, 215), (229, 228, 228), (255, 255, 255), (20, 3, 2),
+    (40, 6, 3), (59, 10, 5), (79, 13, 6), (99, 16, 8), (107, 0, 8), (148, 8, 0),
+    (140, 33, 8), (148, 16, 0), (156, 24, 0), (173, 57, 0), (189, 82, 8), (206, 99, 16),
+    (200, 94, 11), (214, 101, 0), (214, 132, 33), (222, 123, 24), (231, 140, 33),
+    (231, 156, 41), (239, 173, 57), (222, 156, 49), (222, 165, 57), (222, 165, 74),
+    (231, 173, 99), (239, 189, 90), (247, 198, 82), (239, 206, 115), (249, 249, 149),
+    (235, 230, 97), (183, 180, 81), (169, 133, 50), (131, 124, 45), (123, 99, 39),
+    (149, 101, 17), (87, 59, 2), (80, 67, 28), (78, 48, 3), (53, 40, 12), (36, 24, 5),
+    (171, 72, 69), (169, 168, 158), (153, 150, 139), (249, 249, 195), (223, 216, 188),
+    (200, 189, 151), (194, 186, 139), (186, 172, 145), (167, 164, 145), (160, 151, 127),
+    (175, 168, 134), (160, 145, 106), (157, 145, 109), (136, 130, 107), (132, 125, 80),
+    (116, 104, 81), (96, 94, 83), (84, 73, 55), (115, 72, 1), (106, 81, 30),
+    (109, 118, 109), (93, 106, 102), (79, 96, 90), (68, 91, 86), (63, 76, 73),
+    (62, 63, 57), (48, 70, 67), (46, 61, 56), (37, 59, 54), (34, 50, 45), (31, 42, 41),
+    (24, 36, 32), (19, 23, 21), (16, 14, 14), (15, 10, 6), (7, 11, 9), (181, 191, 204),
+    (150, 156, 172), (139, 149, 164), (134, 143, 156), (125, 134, 150), (120, 130, 143),
+    (115, 124, 139), (112, 129, 150), (111, 120, 135), (107, 116, 131), (106, 124, 145),
+    (101, 117, 141), (100, 111, 128), (100, 108, 123), (96, 108, 123), (96, 104, 120),
+    (95, 112, 135), (92, 104, 119), (92, 100, 116), (91, 108, 131), (88, 100, 115),
+    (88, 96, 112), (85, 104, 127), (84, 96, 111), (84, 92, 108), (83, 100, 123),
+    (80, 96, 119), (80, 92, 108), (80, 88, 104), (76, 96, 119), (76, 92, 116),
+    (76, 92, 110), (76, 84, 100), (75, 88, 103), (74, 88, 108), (72, 92, 115),
+    (72, 88, 112), (72, 84, 104), (72, 84, 99), (72, 80, 95), (68, 88, 112),
+    (68, 84, 108), (68, 80, 100), (68, 76, 92), (67, 84, 102), (67, 80, 95),
+    (64, 84, 108), (64, 80, 104), (64, 76, 96), (64, 72, 87), (63, 80, 100),
+    (63, 76, 91), (60, 80, 104), (60, 76, 104), (60, 76, 100), (60, 72, 92),
+    (60, 68, 83), (59, 76, 96), (59, 72, 87), (56, 76, 100), (56, 72, 100),
+    (56, 72, 96), (56, 64, 79), (55, 72, 92), (55, 68, 83), (53, 68, 88),
+    (52, 72, 96), (52, 68, 96), (52, 68, 92), (52, 64, 88), (52, 60, 75),
+    (51, 64, 79), (49, 64, 84), (48, 68, 92), (48, 64, 92), (48, 60, 84),
+    (47, 64, 88), (47, 60, 75), (47, 56, 72), (46, 56, 68), (45, 60, 88),
+    (45, 60, 80), (44, 56, 79), (44, 52, 68), (44, 51, 64), (43, 60, 84),
+    (40, 56, 80), (40, 56, 76), (40, 52, 76), (40, 48, 64), (40, 48, 60),
+    (40, 44, 60), (36, 52, 72), (36, 51, 76), (36, 48, 72), (36, 40, 56),
+    (35, 44, 60), (33, 41, 56), (31, 38, 53), (28, 36, 49), (26, 33, 45),
+    (24, 30, 41), (22, 27, 38), (20, 24, 34), (17, 22, 30), (15, 19, 26),
+    (13, 16, 23), (11, 13, 19), (9, 10, 15), (6, 8, 11), (4, 5, 8), (2, 2, 4),
+    (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0),
+    (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0),
+    (0, 0, 0), (0, 0, 0), (0, 255, 255), (0, 127, 127), (0, 63, 63),
+    (78, 194, 242), (14, 153, 240), (7, 109, 222), (12, 149, 203), (6, 102, 171),
+    (6, 93, 136), (3, 56, 124), (26, 35, 80), (0, 127, 255), (0, 99, 199),
+    (0, 70, 141), (0, 34, 69), (0, 21, 42), (0, 255, 0), (0, 127, 0), (0, 63, 0),
+    (0, 31, 0), (0, 15, 0), (255, 0, 0), (127, 0, 0), (63, 0, 0), (31, 0, 0),
+    (15, 0, 0), (255, 255, 0), (164, 164, 0), (127, 127, 0), (80, 80, 0),
+    (64, 64, 0), (255, 0, 255)
+]
+
+def resource_path(relative_path):
+    """ Get absolute path to resource, works for dev and for PyInstaller """
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+# --- JOB OPTIONS ---
+# Captured from the UI once per job. Frozen so a batch can't change settings
+# halfway through, and built from plain values so they pickle to worker processes.
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    compress: str = "Auto"  # Auto / DXT1 / DXT5 / None
+    mips: bool = True
+    mip_alpha_coverage: bool = False  # Keep alpha-test coverage stable down the mip chain (cutouts)
+    encoder: str = "Auto"  # Auto (texconv when available) / Built-in
+    texconv_path: str = ""  # Explicit texconv binary (any OS); empty = bundled texconv.exe on Windows
+    batch_texconv: bool = True  # Let texconv_batch() group a whole batch into a few texconv runs
+    texconv_scratch: str = ""  # Set by texconv_batch(): queue DDS encodes here instead of running texconv
+
+@dataclass(frozen=True)
+class TextureOptions:
+    to_ext: str = ".dds"
+    scale_cutoff: str = "Disabled"
+    auto_alpha: bool = True
+    overwrite: bool = False
+    gen_emissive: bool = False
+    emissive_thresh: int = 200
+    gen_specular: bool = False
+    spec_contrast: float = 1.5
+    gen_normal: bool = False
+    norm_strength: float = 2.0
+    norm_flip_y: bool = False
+    memory_limit_mb: int = 2048  # Skip files whose estimated working memory exceeds this (per worker process)
+    encode: EncodeOptions = field(default_factory=EncodeOptions)
+
+@dataclass(frozen=True)
+class MapOptions:
+    scale: str = "No Scaling"
+    palette: tuple = tuple(BUILTIN_MOON_PALETTE)  # Workspace palette (256 RGB tuples)
+    palette_path: str = ""  # Optional .ACT override, wins over `palette`
+    out_format: str = "ARGB8888"  # PNG -> MAP: a BZMapFormat name, or "Auto" (16-bit, by alpha)
+    dither: bool = False    # Error-diffuse when quantizing to the palette
+
+@dataclass(frozen=True)
+class DXTOptions:
+    out_ext: str = ".dds"
+    overwrite: bool = False
+    encode: EncodeOptions = field(default_factory=EncodeOptions)
+
+@dataclass(frozen=True)
+class LGTOptions:
+    width: int = 0  # Map width in zones, 0 = Auto-Square
+    height: int = 0 # Map height in zones, 0 = whatever the file holds
+
+def _noop_log(msg):
+    pass
+
+# --- TRACING ---
+# Per-thread list that stage() appends to; None when nothing is being traced
+_trace_state = threading.local()
+
+def _file_bytes(path):
+    try: return os.path.getsize(path)
+    except OSError: return 0
+
+@contextmanager
+def traced(enabled=True):
+    """Collects the stage() records of everything run inside and yields the list."""
+    if not enabled:
+        yield []
+        return
+    prev = getattr(_trace_state, "records", None)
+    _trace_state.records = records = []
+    try:
+        yield records
+    finally:
+        _trace_state.records = prev
+
+@contextmanager
+def stage(name, **info):
+    """
+    Times one step of a converter into the active trace. Keyword fields
+    (w, h, bytes_in, bytes_out, out) are stored with it and the yielded dict
+    can be filled in while the step runs. Costs nothing when untraced.
+    """
+    records = getattr(_trace_state, "records", None)
+    if records is None:
+        yield info
+        return
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        info["stage"] = name
+        info["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        records.append(info)
+
+class TraceLog:
+    """
+    Appends stage() records to a JSON-lines file, one {"file", "stage", "ms", ...}
+    object per line after a {"batch", "started"} header, and keeps the totals
+    behind summary(). Stages nest (texconv runs inside save), so a file's own
+    time is its "total" record.
+    """
+    def __init__(self, path, batch):
+        self.f = open(path, "a", encoding="utf-8")
+        self.f.write(json.dumps({"batch": batch, "started": time.strftime("%Y-%m-%d %H:%M:%S")}) + "\n")
+        self.stages = {}  # name -> [calls, total ms, max ms]
+        self.files = {}   # path -> total ms
+
+    def add(self, path, records):
+        for rec in records:
+            self.f.write(json.dumps({"file": path, **rec}) + "\n")
+            s = self.stages.setdefault(rec["stage"], [0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += rec["ms"]
+            s[2] = max(s[2], rec["ms"])
+            if rec["stage"] == "total":
+                self.files[path] = rec["ms"]
+
+    def summary(self, top=5):
+        """Table lines: stages by total time, then the `top` slowest files."""
+        lines = [f"{'stage':<12}{'calls':>7}{'total s':>10}{'mean ms':>10}{'max ms':>10}"]
+        for name, (calls, total, peak) in sorted(self.stages.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f"{name:<12}{calls:>7}{total / 1000:>10.2f}{total / calls:>10.1f}{peak:>10.1f}")
+        slowest = sorted(self.files.items(), key=lambda kv: -kv[1])[:top]
+        if slowest:
+            lines.append("Slowest files:")
+            lines.extend(f"{ms:>10.1f} ms  {os.path.basename(p)}" for p, ms in slowest)
+        return lines
+
+    def close(self):
+        self.f.close()
+
+# --- BATCH RUNNER ---
+# One finished file: `msg` on success, `error` (a string) on failure, plus any
+# side notes the converter logged while it ran and its stage() records.
+BatchResult = namedtuple("BatchResult", "path msg error notes stages", defaults=((),))
+
+def default_workers():
+    return os.cpu_count() or 1
+
+def _run_job(func, path, args, trace=False):
+    """Runs one converter call and folds its outcome into a picklable BatchResult."""
+    notes = []
+    with traced(trace) as stages:
+        try:
+            with stage("total", bytes_in=_file_bytes(path)):
+                msg = func(path, *args, log=notes.append)
+            return BatchResult(path, msg, None, notes, stages)
+        except Exception as e:
+            return BatchResult(path, None, str(e), notes, stages)
+
+class BatchControl:
+    """
+    Pause/cancel switch shared by a running batch and whoever drives it.
+    Checked between files: pausing lets the files already running finish,
+    cancelling stops handing out new ones.
+    """
+    def __init__(self):
+        self._run = threading.Event()
+        self._run.set()
+        self.cancelled = False
+        self.paused_seconds = 0.0
+        self._paused_at = None
+
+    @property
+    def paused(self):
+        return not self._run.is_set()
+
+    def pause(self):
+        if not self.paused and not self.cancelled:
+            self._paused_at = time.perf_counter()
+            self._run.clear()
+
+    def resume(self):
+        if self.paused:
+            self.paused_seconds += time.perf_counter() - self._paused_at
+            self._run.set()
+
+    def cancel(self):
+        self.cancelled = True
+        self.resume()
+
+    def proceed(self):
+        """Blocks while paused; False once the batch is cancelled."""
+        self._run.wait()
+        return not self.cancelled
+
+class BatchMeter:
+    """Files/s, MB/s and ETA of a running batch; time spent paused doesn't count."""
+    def __init__(self, control=None):
+        self.control = control
+        self.start = time.perf_counter()
+        self.files = 0
+        self.bytes = 0
+
+    def add(self, path):
+        """Counts one finished file, sized by its source."""
+        self.files += 1
+        try: self.bytes += os.path.getsize(path)
+        except OSError: pass
+
+    def elapsed(self):
+        paused = 0.0
+        if self.control:
+            paused = self.control.paused_seconds
+            if self.control.paused:
+                paused += time.perf_counter() - self.control._paused_at
+        return max(1e-6, time.perf_counter() - self.start - paused)
+
+    def status(self, total=0, final=True):
+        """
+        e.g. '12/40 | 3.1 files/s | 8.4 MB/s | ETA 0:09'. A total that isn't
+        final yet (the scan is still running) shows as '40+' and gets no ETA.
+        """
+        rate = self.files / self.elapsed()
+        shown = f"{total}{'' if final else '+'}" if total else "?"
+        text = f"{self.files}/{shown} | {rate:.1f} files/s | {self.bytes / self.elapsed() / 1e6:.1f} MB/s"
+        if total and final and rate > 0:
+            eta = int((total - self.files) / rate)
+            text += f" | ETA {eta // 60}:{eta % 60:02d}"
+        return text
+
+def iter_batch(func, paths, *args, workers=1, job_args=None, control=None, trace=False):
+    """
+    Runs func(path, *args, log=...) for every path and yields BatchResults in
+    completion order. With workers > 1 the files are spread over a process
+    pool; only a couple of jobs per worker are queued at a time, so `paths`
+    may be a lazy iterator. func and args must be picklable.
+    job_args(path), if given, returns extra per-file arguments appended after
+    args; it runs in the calling process.
+    control, a BatchControl, is checked before each new file is started.
+    With trace on, each result carries the file's stage() timings.
+    """
+    def call_args(path):
+        return args + tuple(job_args(path)) if job_args else args
+
+    if workers <= 1:
+        for path in paths:
+            if control and not control.proceed():
+                return
+            yield _run_job(func, path, call_args(path), trace)
+        return
+
+    paths = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < workers * 2:
+                if control:
+                    # Paused: report the files still running before blocking
+                    if control.paused and pending:
+                        break
+                    if not control.proceed():
+                        exhausted = True
+                        break
+                path = next(paths, None)
+                if path is None:
+                    exhausted = True
+                    break
+                pending.add(pool.submit(_run_job, func, path, call_args(path), trace))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+
+# --- FILE DISCOVERY ---
+def split_patterns(text):
+    """Entry text like '*_d.png; backup/*' -> tuple of glob patterns."""
+    return tuple(p for p in re.split(r"[;,\s]+", text or "") if p)
+
+def _glob_match(rel, name, patterns):
+    return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+def iter_sources(root, extensions, include=(), exclude=(), recursive=True, skip=()):
+    """
+    Yields files under root whose extension is in `extensions`, walking the
+    tree lazily with os.scandir so a batch can start converting the first
+    match while the rest is still being scanned. Globs are matched
+    case-insensitively against the path relative to root ('/' separated) and
+    against the bare name; excluded folders are not entered. Folders in
+    `skip` (e.g. the batch output folder) are never entered either.
+    """
+    extensions = {e.lower() for e in extensions}
+    include = tuple(p.lower() for p in include)
+    exclude = tuple(p.lower() for p in exclude)
+    skip = {os.path.normcase(os.path.abspath(d)) for d in skip if d}
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted(it, key=lambda e: e.name.lower())
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            rel = os.path.relpath(entry.path, root).replace(os.sep, "/").lower()
+            name = entry.name.lower()
+            if exclude and _glob_match(rel, name, exclude):
+                continue
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                if recursive and os.path.normcase(os.path.abspath(entry.path)) not in skip:
+                    subdirs.append(entry.path)
+            elif os.path.splitext(name)[1] in extensions:
+                if not include or _glob_match(rel, name, include):
+                    yield entry.path
+        # Depth-first, in name order
+        stack.extend(reversed(subdirs))
+
+class ScanAhead:
+    """
+    Runs a lazy path iterator (a scan, optionally filtered by the build cache)
+    on its own thread and hands the paths out in order. `found` counts every
+    path discovered so far and is final once `done`, so progress and ETA
+    reflect the scan rather than how far the batch has got.
+    """
+    _END = object()
+
+    def __init__(self, paths):
+        self.found = 0
+        self.done = False
+        self._error = None
+        self._stop = False
+        self._queue = queue.Queue()
+        threading.Thread(target=self._scan, args=(paths,), daemon=True).start()
+
+    def _scan(self, paths):
+        try:
+            for path in paths:
+                if self._stop: break
+                self.found += 1
+                self._queue.put(path)
+        except Exception as e:
+            self._error = e
+        finally:
+            self.done = True
+            self._queue.put(self._END)
+
+    def __iter__(self):
+        try:
+            while True:
+                path = self._queue.get()
+                if path is self._END: break
+                yield path
+            if self._error is not None:
+                raise self._error
+        finally:
+            # A cancelled batch stops pulling; let the scan stop too
+            self._stop = True
+
+def mirror_dir(path, src_root, out_root):
+    """
+    Output folder for `path` that mirrors its place under src_root inside
+    out_root, created on demand. Returns None (= beside the source) without an
+    out_root.
+    """
+    if not out_root:
+        return None
+    rel = os.path.relpath(os.path.dirname(os.path.abspath(path)), os.path.abspath(src_root))
+    dest = os.path.normpath(os.path.join(out_root, rel))
+    os.makedirs(dest, exist_ok=True)
+    return dest
+
+# --- BUILD CACHE ---
+# Options that never change what a converter writes
+_VOLATILE_OPTIONS = {"overwrite", "batch_texconv", "texconv_scratch", "memory_limit_mb"}
+
+def _strip_volatile(d):
+    return {k: _strip_volatile(v) if isinstance(v, dict) else v
+            for k, v in d.items() if k not in _VOLATILE_OPTIONS}
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def options_fingerprint(kind, opts):
+    """Hash of everything besides the source that decides a job's output bytes."""
+    d = _strip_volatile(asdict(opts))
+    if "encode" in d:
+        # "Auto" means texconv on one machine and the built-in encoder on another
+        d["encode"]["encoder"] = "texconv" if use_texconv(opts.encode) else "Built-in"
+    if isinstance(opts, MapOptions):
+        # The palette's content matters, not where it was loaded from
+        d.pop("palette_path")
+        d["palette"] = [list(c) for c in resolve_palette(opts)]
+    blob = json.dumps([kind, ENGINE_VERSION, d], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+class BuildCache:
+    """
+    Persistent map of (converter, source) -> (source hash, options fingerprint,
+    outputs). A source is up to date when its content and the job options
+    match the last successful build and every output is still on disk
+    untouched, so reruns only redo files whose inputs or settings changed.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.skipped = 0
+        # Outputs older than this weren't written by the current batch. The
+        # slack covers filesystems that store mtimes in 2 s steps (FAT).
+        self.started_ns = time.time_ns() - 2_000_000_000
+        self._digests = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding="utf-8") as f: self.entries = json.load(f)
+            except (OSError, ValueError): pass
+
+    @staticmethod
+    def _stat(path):
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+
+    def _key(self, kind, src):
+        return f"{kind}|{os.path.abspath(src)}"
+
+    def _source_digest(self, src, entry):
+        stat = self._stat(src)
+        # Unchanged size and mtime: trust the stored hash instead of rereading the file
+        if entry and entry.get("stat") == stat:
+            return entry["hash"]
+        digest = self._digests.get(src) or file_digest(src)
+        self._digests[src] = digest
+        return digest
+
+    def is_fresh(self, kind, src, fingerprint, outputs):
+        entry = self.entries.get(self._key(kind, src))
+        if not entry or entry.get("options") != fingerprint:
+            return False
+        recorded = entry.get("outputs", {})
+        if set(recorded) != {os.path.abspath(o) for o in outputs}:
+            return False
+        for out, stat in recorded.items():
+            if not os.path.exists(out) or self._stat(out) != stat:
+                return False
+        if self._source_digest(src, entry) != entry.get("hash"):
+            return False
+        entry["stat"] = self._stat(src) # Touched but identical: remember the new mtime
+        return True
+
+    def iter_stale(self, kind, paths, fingerprint, outputs_for):
+        """Lazily filters paths down to the ones that need a rebuild; `skipped` counts the rest."""
+        for p in paths:
+            if self.is_fresh(kind, p, fingerprint, outputs_for(p)):
+                self.skipped += 1
+            else:
+                yield p
+
+    def record(self, kind, src, fingerprint, outputs):
+        """Remembers a successful build, unless an output is missing or left over from an earlier run."""
+        key = self._key(kind, src)
+        if not outputs or not all(self._written_since_start(o) for o in outputs):
+            self.entries.pop(key, None)
+            return
+        self.entries[key] = {
+            "hash": self._source_digest(src, self.entries.get(key)),
+            "stat": self._stat(src),
+            "options": fingerprint,
+            "outputs": {os.path.abspath(o): self._stat(o) for o in outputs},
+        }
+        self._digests.pop(src, None)
+
+    def _written_since_start(self, path):
+        try: return os.stat(path).st_mtime_ns >= self.started_ns
+        except OSError: return False
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding="utf-8") as f: json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+# --- PALETTES ---
+def read_act(path):
+    """Reads a 256-colour .ACT file into a list of [r, g, b] entries."""
+    with open(path, 'rb') as f:
+        raw = f.read(768)
+        return [list(struct.unpack('<3B', raw[i:i+3])) for i in range(0, 768, 3)]
+
+def write_act(path, palette):
+    with open(path, 'wb') as f:
+        for color in palette:
+            f.write(struct.pack('<3B', *color))
+
+@lru_cache(maxsize=16)
+def _cached_act(path, mtime_ns, size):
+    return tuple(tuple(c) for c in read_act(path))
+
+def resolve_palette(opts):
+    """Returns the palette a MAP job should use: the .ACT override if set, else the workspace one."""
+    override_path = opts.palette_path
+    if override_path and os.path.exists(override_path) and override_path.lower().endswith(".act"):
+        # Parsed once per batch; a changed file has a new mtime/size and is read again
+        st = os.stat(override_path)
+        return _cached_act(os.path.abspath(override_path), st.st_mtime_ns, st.st_size)
+    return tuple(tuple(c) for c in opts.palette)
+
+@lru_cache(maxsize=16)
+def palette_lut(palette):
+    """256x4 RGBA lookup table for a palette (tuple of (r, g, b)); shared, read-only."""
+    lut = np.zeros((256, 4), dtype=np.uint8)
+    lut[:, 3] = 255
+    lut[:len(palette), :3] = np.asarray(palette, dtype=np.uint8)[:256, :3]
+    lut.flags.writeable = False
+    return lut
+
+# --- PALETTE QUANTIZER ---
+# Bits per channel kept when looking a colour up in the nearest-colour cube
+QUANT_BITS = 6
+
+def nearest_palette_index(colors, palette):
+    """Index of the closest palette entry (squared RGB distance) for each colour in an (..., 3) array."""
+    pal = np.asarray(palette, dtype=np.int32)[:256, :3]
+    colors = np.asarray(colors, dtype=np.int32).reshape(-1, 3)
+    pal_sq = (pal * pal).sum(1)
+    out = np.empty(len(colors), dtype=np.uint8)
+    for start in range(0, len(colors), 4096):
+        c = colors[start:start + 4096]
+        # |c - p|^2 = |p|^2 - 2 c.p + |c|^2, and |c|^2 doesn't change the argmin
+        out[start:start + 4096] = (pal_sq - 2 * (c @ pal.T)).argmin(1)
+    return out
+
+def _cube_cell(r, g, b):
+    """Cube cell of uint32 channel values."""
+    shift = 8 - QUANT_BITS
+    return ((r >> shift) << (2 * QUANT_BITS)) | ((g >> shift) << QUANT_BITS) | (b >> shift)
+
+PaletteTables = namedtuple("PaletteTables", "nearest exact crowded packed keys order")
+
+@lru_cache(maxsize=4)
+def palette_tables(palette):
+    """
+    Lookup tables for quantizing to `palette`, built once per palette:
+    nearest - nearest palette index for every cell of a QUANT_BITS^3 RGB cube
+    exact   - the palette entry inside each cell (if any), for exact matches
+    crowded - cells holding more than one distinct palette colour
+    packed  - 0xRRGGBB of every entry; keys/order - the same sorted, for crowded cells
+    """
+    levels = 1 << QUANT_BITS
+    step = 256 // levels
+    centres = np.arange(levels) * step + step // 2
+    r, g, b = np.meshgrid(centres, centres, centres, indexing="ij")
+    nearest = nearest_palette_index(np.stack([r, g, b], -1), palette)
+
+    pal = np.asarray(palette, dtype=np.uint32)[:256, :3]
+    packed = (pal[:, 0] << 16) | (pal[:, 1] << 8) | pal[:, 2]
+    cells = _cube_cell(pal[:, 0], pal[:, 1], pal[:, 2])
+    exact = nearest.copy()
+    # Assigned in reverse so duplicate colours resolve to the lowest index
+    exact[cells[::-1]] = np.arange(len(pal), dtype=np.uint8)[::-1]
+    _, first = np.unique(packed, return_index=True)
+    crowded = np.bincount(cells[first], minlength=levels ** 3) > 1
+    order = np.argsort(packed, kind="stable")
+    for table in (nearest, exact, crowded, packed):
+        table.flags.writeable = False
+    return PaletteTables(nearest, exact, crowded, packed, packed[order], order.astype(np.uint8))
+
+def quantize_to_palette(rgb, palette):
+    """(H, W, 3) uint8 -> (H, W) palette indices. Colours already in the palette keep their exact index."""
+    t = palette_tables(palette)
+    r, g, b = (rgb[..., i].astype(np.uint32) for i in range(3))
+    cell = _cube_cell(r, g, b)
+    px = (r << 16) | (g << 8) | b
+    indices = t.nearest[cell]
+    candidate = t.exact[cell]
+    exact = t.packed[candidate] == px
+    indices[exact] = candidate[exact]
+    # Cells with several palette colours only keep one candidate; search the rest exactly
+    crowded = t.crowded[cell] & ~exact
+    if crowded.any():
+        sub = px[crowded]
+        pos = np.minimum(np.searchsorted(t.keys, sub), len(t.keys) - 1)
+        hit = t.keys[pos] == sub
+        fixed = indices[crowded]
+        fixed[hit] = t.order[pos[hit]]
+        indices[crowded] = fixed
+    return indices
+
+def dither_to_palette(rgb, palette):
+    """(H, W, 3) uint8 -> (H, W) palette indices with Floyd-Steinberg error diffusion."""
+    pal_img = Image.new("P", (1, 1))
+    pal_img.putpalette([v for c in palette[:256] for v in c[:3]])
+    return np.asarray(Image.fromarray(rgb, "RGB").quantize(palette=pal_img, dither=Image.Dither.FLOYDSTEINBERG))
+
+def remap_indexed(img, palette):
+    """Indices of a 'P' mode image re-expressed in `palette`; lossless when its colours are all in it."""
+    src_pal = np.zeros((256, 3), dtype=np.uint8)
+    raw = np.asarray(img.getpalette() or [], dtype=np.uint8)[:768].reshape(-1, 3)
+    src_pal[:len(raw)] = raw
+    dst_pal = np.asarray(palette, dtype=np.uint8)[:256, :3]
+    remap = nearest_palette_index(src_pal, palette)
+    # Identical entries keep their index, so a matching palette passes straight through
+    same = np.zeros(256, dtype=bool)
+    same[:len(dst_pal)] = (src_pal[:len(dst_pal)] == dst_pal).all(1)
+    remap[same] = np.arange(256, dtype=np.uint8)[same]
+    return remap[np.asarray(img)]
+
+# --- OUTPUT NAMING ---
+def dest_dir_for(path, output_folder=None):
+    return output_folder if (output_folder and os.path.isdir(output_folder)) else os.path.dirname(path)
+
+def gen_base_name(file_no_ext):
+    # Smart naming: if input ends in _d, strip it so we get _e/_s/_n instead of _d_e
+    if file_no_ext.lower().endswith("_d"):
+        return file_no_ext[:-2]
+    return file_no_ext
+
+def texture_outputs(path, opts, output_folder=None):
+    """Every file process_texture writes for `path`: the converted texture, then any generated maps."""
+    dest_dir = dest_dir_for(path, output_folder)
+    file_no_ext = os.path.splitext(os.path.basename(path))[0]
+    gen_name = gen_base_name(file_no_ext)
+    outputs = [os.path.join(dest_dir, file_no_ext + opts.to_ext)]
+    for enabled, suffix in ((opts.gen_emissive, "_e"), (opts.gen_specular, "_s"), (opts.gen_normal, "_n")):
+        if enabled:
+            outputs.append(os.path.join(dest_dir, f"{gen_name}{suffix}{opts.to_ext}"))
+    return outputs
+
+def map_outputs(path, opts, output_folder=None):
+    file_no_ext = os.path.splitext(os.path.basename(path))[0]
+    ext = ".png" if path.lower().endswith(".map") else ".map"
+    return [os.path.join(dest_dir_for(path, output_folder), file_no_ext + ext)]
+
+def dxtbz2_outputs(path, opts):
+    file_no_ext = os.path.splitext(os.path.basename(path))[0]
+    return [os.path.join(os.path.dirname(path), file_no_ext + opts.out_ext)]
+
+# --- PROBE ---
+# What a file's header says about it, without decoding any pixels. `alpha`
+# means an alpha channel can exist, not that any pixel uses it. A width and
+# height of 0 mean the header doesn't say (an LGT without its terrain grid).
+ImageInfo = namedtuple("ImageInfo", "kind width height pixel_format mips alpha")
+
+_PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+_PNG_MODES = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+
+def _probe_png(f):
+    f.seek(8)
+    _, ctype, w, h, depth, color = struct.unpack(">I4sIIBB", f.read(18))
+    alpha = color in (4, 6)
+    # tRNS (palette or colour-key transparency) must come before the first IDAT
+    f.seek(33)
+    while not alpha:
+        head = f.read(8)
+        if len(head) < 8: break
+        length, ctype = struct.unpack(">I4s", head)
+        if ctype in (b"IDAT", b"IEND"): break
+        alpha = ctype == b"tRNS"
+        f.seek(length + 4, os.SEEK_CUR)
+    return ImageInfo("png", w, h, f"{_PNG_MODES.get(color, '?')}{depth}", 1, alpha)
+
+def _probe_dds(f):
+    f.seek(4)
+    _, flags, h, w, _, _, mips = struct.unpack("<7I", f.read(28))
+    f.seek(76)
+    _, pf_flags, fourcc, bits, _, _, _, amask = struct.unpack("<II4s5I", f.read(32))
+    mips = max(1, mips) if flags & dds_codec.DDSD_MIPMAPCOUNT else 1
+    if pf_flags & dds_codec.DDPF_FOURCC:
+        name = fourcc.decode("ascii", "replace").strip("\0")
+        # DXT1 can carry punch-through alpha; BC4/BC5 never do
+        alpha = fourcc not in (b"ATI1", b"ATI2", b"BC4U", b"BC5U")
+        return ImageInfo("dds", w, h, name, mips, alpha)
+    alpha = bool(pf_flags & dds_codec.DDPF_ALPHAPIXELS and amask)
+    return ImageInfo("dds", w, h, f"{'BGRA' if alpha else 'BGR'}{bits}", mips, alpha)
+
+def _probe_tga(f):
+    id_len, cmap_type, img_type, _, _, cmap_bits, _, _, w, h, bits, desc = struct.unpack("<BBBHHBHHHHBB", f.read(18))
+    if img_type & 3 == 1: # Colour-mapped
+        return ImageInfo("tga", w, h, "P8", 1, cmap_bits == 32)
+    if img_type & 3 == 3:
+        return ImageInfo("tga", w, h, f"L{bits}", 1, False)
+    alpha = bits == 32 or (desc & 0x0F) > 0
+    return ImageInfo("tga", w, h, f"{'BGRA' if alpha else 'BGR'}{bits}", 1, alpha)
+
+def _probe_map(f):
+    rb, fmt, h, _ = struct.unpack("<4H", f.read(8))
+    if fmt >= len(BZMapFormat.names):
+        raise Exception(f"Unknown MAP format {fmt}.")
+    alpha = fmt in (BZMapFormat.ARGB4444, BZMapFormat.ARGB8888)
+    return ImageInfo("map", rb // BZMapFormat.bpp[fmt], h, BZMapFormat.names[fmt], 1, alpha)
+
+def _probe_dxtbz2(f):
+    header = DXTBZ2Header()
+    f.readinto(header)
+    w, h = header.m_BaseWidth, header.m_BaseHeight
+    size_raw = f.read(4)
+    # Same density rule process_dxtbz2 uses: DXT5 stores one byte per pixel
+    alpha = len(size_raw) == 4 and h > 0 and struct.unpack("<I", size_raw)[0] // h == w
+    return ImageInfo("dxtbz2", w, h, "DXT5" if alpha else "DXT1", max(1, header.m_NumMips), alpha)
+
+def _probe_lgt(path, grid=None):
+    # The file is only zones; their arrangement comes from the terrain, never a guess
+    zones = os.path.getsize(path) // (ZONE_RES * ZONE_RES) - 1
+    if grid and grid[0] > 0 and grid[1] > 0 and grid[0] * grid[1] == zones:
+        return ImageInfo("lgt", grid[0] * ZONE_RES, grid[1] * ZONE_RES, "L8", 1, False)
+    return ImageInfo("lgt", 0, 0, f"L8, {max(0, zones)} zones", 1, False)
+
+def _probe_uncached(path, grid=None):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".lgt":
+        return _probe_lgt(path, grid)
+    with open(path, "rb") as f:
+        magic = f.read(8)
+        f.seek(0)
+        if magic == _PNG_MAGIC: return _probe_png(f)
+        if magic[:4] == b"DDS ": return _probe_dds(f)
+        if ext == ".map": return _probe_map(f)
+        if ext == ".dxtbz2": return _probe_dxtbz2(f)
+        if ext == ".tga": return _probe_tga(f)
+    # Anything else: PIL reads just the header until pixels are asked for
+    with Image.open(path) as img:
+        alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+        return ImageInfo((img.format or ext.lstrip(".")).lower(), img.width, img.height, img.mode, 1, alpha)
+
+@lru_cache(maxsize=4096)
+def _probe_cached(path, mtime_ns, size, grid):
+    return _probe_uncached(path, grid)
+
+def probe(path, grid=None):
+    """
+    ImageInfo for a texture, MAP, LGT or DXTBZ2 from its header alone; cached
+    until the file changes. An LGT only has a size when `grid` (zones wide,
+    zones high, e.g. from TerrainIndex.grid_for) is given.
+    """
+    st = os.stat(path)
+    try:
+        return _probe_cached(os.path.abspath(path), st.st_mtime_ns, st.st_size, tuple(grid) if grid else None)
+    except struct.error:
+        raise Exception(f"Truncated header in {os.path.basename(path)}.")
+
+# --- PREVIEWS ---
+PREVIEW_SIZE = (300, 200)
+
+def make_thumbnail(path, box=PREVIEW_SIZE):
+    """
+    RGB/RGBA thumbnail fitting `box`. DDS files are read from the smallest
+    stored mip still at least thumbnail size; JPEGs decode at reduced size.
+    """
+    info = probe(path)
+    scale = min(box[0] / max(1, info.width), box[1] / max(1, info.height), 1.0)
+    tw, th = max(1, int(info.width * scale)), max(1, int(info.height * scale))
+    level = None
+    if info.kind == "dds":
+        i = 0
+        while i + 1 < info.mips and info.width >> (i + 1) >= tw and info.height >> (i + 1) >= th:
+            i += 1
+        level = read_dds_source(path, info, (info.width >> i, info.height >> i) if i else None)
+    if level:
+        fourcc, (w, h), levels = level
+        img = Image.fromarray(dds_codec.decode_level(levels[0], fourcc, w, h), "RGBA")
+    else:
+        img = Image.open(path)
+    # thumbnail() drafts JPEGs and box-reduces before its final filter pass
+    img.thumbnail(box)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+    return img
+
+class ThumbnailCache:
+    """
+    Preview thumbnails keyed by (path, mtime, size): a byte-bounded LRU in
+    memory in front of PNGs on disk, so reselecting a file never decodes it
+    again. Safe to share between the UI thread and a loader thread.
+    """
+    def __init__(self, folder, box=PREVIEW_SIZE, max_bytes=32 << 20):
+        self.folder = folder
+        self.box = box
+        self.max_bytes = max_bytes
+        self._mem = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _key(self, path):
+        st = os.stat(path)
+        return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+    def _disk_path(self, key):
+        # One file per source and box; a changed source overwrites its old thumbnail
+        name = hashlib.sha1(f"{key[0]}|{self.box}".encode("utf-8")).hexdigest()
+        return os.path.join(self.folder, name + ".png")
+
+    def _remember(self, key, img):
+        with self._lock:
+            if key in self._mem:
+                return
+            self._mem[key] = img
+            self._bytes += img.width * img.height * len(img.getbands())
+            while self._bytes > self.max_bytes and len(self._mem) > 1:
+                _, old = self._mem.popitem(last=False)
+                self._bytes -= old.width * old.height * len(old.getbands())
+
+    def peek(self, path):
+        """The thumbnail if it's already in memory, else None. Never decodes."""
+        try:
+            key = self._key(path)
+        except OSError:
+            return None
+        with self._lock:
+            img = self._mem.get(key)
+            if img is not None:
+                self._mem.move_to_end(key)
+            return img
+
+    def get(self, path):
+        """The thumbnail from memory, disk or a fresh decode, in that order."""
+        img = self.peek(path)
+        if img is not None:
+            return img
+        key = self._key(path)
+        stamp = f"{key[1]}:{key[2]}"
+        disk = self._disk_path(key)
+        img = None
+        try:
+            with Image.open(disk) as cached:
+                if cached.info.get("source") == stamp:
+                    img = cached.copy()
+        except OSError:
+            pass
+        if img is None:
+            img = make_thumbnail(path, self.box)
+            try:
+                meta = PngInfo()
+                meta.add_text("source", stamp)
+                os.makedirs(self.folder, exist_ok=True)
+                img.save(disk, pnginfo=meta)
+            except OSError:
+                pass  # a read-only cache folder only costs the next decode
+        self._remember(key, img)
+        return img
+
+# --- TEXTURES ---
+def process_texture(path, opts, output_folder=None, log=_noop_log):
+    base_name = os.path.basename(path)
+    file_no_ext = os.path.splitext(base_name)[0]
+    dest_dir = dest_dir_for(path, output_folder)
+
+    target_ext = opts.to_ext
+    out_path = os.path.join(dest_dir, file_no_ext + target_ext)
+
+    # CHECK FOR OVERWRITE
+    if os.path.exists(out_path) and not opts.overwrite:
+        return f"Skipped: {file_no_ext}{target_ext} already exists."
+
+    info = probe(path)
+
+    # --- Power of 2 Rescaling Logic ---
+    target = budget_size(info.width, info.height, opts.scale_cutoff)
+    # A DDS that already stores a mip at the target size is read from there, chain and all
+    with stage("decode", w=info.width, h=info.height, bytes_in=_file_bytes(path)):
+        dds_src = read_dds_source(path, info, target)
+        if dds_src:
+            fourcc, (w, h), levels = dds_src
+            check_memory((w, h), opts)
+            img = Image.fromarray(dds_codec.decode_level(levels[0], fourcc, w, h), "RGBA")
+        else:
+            # Size is known before decoding: refuse early rather than die with MemoryError mid-batch.
+            # A downscaled file only pays for its decode at full size; the rest runs at the target.
+            if target:
+                check_memory(target, opts, source=(info.width, info.height))
+            else:
+                check_memory((info.width, info.height), opts)
+            img = Image.open(path)
+            if target:
+                # JPEG decodes straight to 1/2, 1/4 or 1/8 size; other formats ignore this
+                img.draft(None, target)
+            img = img.convert("RGBA")
+    if target and img.size != target:
+        with stage("rescale", w=target[0], h=target[1]):
+            # Integer box reduce down to ~2x the target, then one LANCZOS pass
+            img = img.resize(target, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    w, h = img.size
+
+    # Alpha detection; formats without an alpha channel don't need the scan
+    has_alpha = False
+    if opts.auto_alpha and info.alpha:
+        with stage("alpha_scan", w=w, h=h):
+            # Per-band extrema are computed in place; no alpha copy is made
+            alpha_extrema = img.getextrema()[3]
+        if alpha_extrema and alpha_extrema[0] < 255:
+            has_alpha = True
+
+    gen_name = gen_base_name(file_no_ext)
+
+    gen_derived_maps(img, dest_dir, gen_name, opts, log)
+
+    if dds_src and out_path.lower().endswith(".dds"):
+        keep = dds_carry_levels(dds_src, has_alpha, opts.encode)
+        if keep:
+            with stage("copy_mips", w=w, h=h, out=os.path.basename(out_path)) as rec:
+                dds_codec.write_dds(out_path, w, h, dds_src[0], keep)
+                rec["bytes_out"] = _file_bytes(out_path)
+            return f"Done: {file_no_ext} ({w}x{h}) -> {target_ext} (copied {len(keep)} mip level(s), no re-encode)"
+
+    save_img(img, out_path, has_alpha, opts.encode, log)
+    return f"Done: {file_no_ext} ({w}x{h}) -> {target_ext}"
+
+def read_dds_source(path, info, target=None):
+    """
+    (fourcc, (w, h), levels) for a DDS input the built-in codec can decode,
+    starting at the stored mip that matches `target` (the top level without
+    one). None when there is no such mip or PIL has to decode the file.
+    """
+    if info.kind != "dds":
+        return None
+    w, h = info.width, info.height
+    first = 0
+    if target:
+        sizes = [(max(1, w >> i), max(1, h >> i)) for i in range(info.mips)]
+        if target not in sizes:
+            return None
+        first = sizes.index(target)
+    dds = dds_codec.read_dds_levels(path, first)
+    if not dds or not dds[3]:
+        return None
+    return dds[2], (max(1, w >> first), max(1, h >> first)), dds[3]
+
+def dds_carry_levels(dds_src, has_alpha, encode):
+    """Stored mips to copy unchanged into a DDS output, or None when they must be re-encoded."""
+    fourcc, (w, h), levels = dds_src
+    if dds_codec.pick_format(encode.compress, has_alpha) != fourcc:
+        return None
+    # Stored mips weren't built to keep alpha-test coverage
+    if encode.mips and encode.mip_alpha_coverage:
+        return None
+    return passthrough_levels(w, h, levels, fourcc, encode.mips)
+
+def budget_size(w, h, scale_cutoff):
+    """
+    (w, h) halved as many times as needed for both sides to fit the
+    scale_cutoff budget, or None when it already fits (or there is no budget).
+    """
+    try:
+        limit = int(scale_cutoff)
+    except ValueError:
+        return None
+    if limit <= 0:
+        return None
+    factor = 1
+    while (w // factor > limit or h // factor > limit) and (w // factor > 1 or h // factor > 1):
+        factor *= 2
+    return (max(1, w // factor), max(1, h // factor)) if factor > 1 else None
+
+# --- MEMORY BUDGET ---
+# Peak bytes per pixel while a texture is converted, calibrated on RSS peaks of
+# a 4096x4096 random RGBA built-in DDS encode: 20.5 B/px plain, 26.6 with one
+# derived map and 34.5 with all three (the maps are derived together and held
+# as RGBA until each is encoded, plus the luminance they share).
+TEXTURE_BYTES_PER_PIXEL = 24
+DERIVED_MAP_BYTES_PER_PIXEL = 4
+LUMINANCE_BYTES_PER_PIXEL = 2
+# Margin over the calibrated figures, for sources and allocators that peak higher
+MEMORY_HEADROOM = 1.1
+# The full-size RGBA decode a downscaled texture is resized from
+DECODE_BYTES_PER_PIXEL = 4
+# Temporaries alive at once per pixel of a derived-map band (float32 normals dominate)
+NORMAL_BAND_BYTES_PER_PIXEL = 24
+# Bands this size are already fast; larger ones only raise the peak
+BAND_BYTES = 32 << 20
+
+def texture_bytes_per_pixel(opts):
+    maps = int(opts.gen_emissive) + int(opts.gen_specular) + int(opts.gen_normal)
+    extra = maps * DERIVED_MAP_BYTES_PER_PIXEL + LUMINANCE_BYTES_PER_PIXEL if maps else 0
+    return TEXTURE_BYTES_PER_PIXEL + extra
+
+def check_memory(size, opts, source=None):
+    """
+    Refuses a file up front when its estimated peak memory is over the limit.
+    size is what the pipeline works at; source, when larger, is the decode it is
+    resized from. This is an estimate checked once, not a ceiling enforced while it runs.
+    """
+    w, h = size
+    need = w * h * texture_bytes_per_pixel(opts)
+    if opts.gen_emissive or opts.gen_specular or opts.gen_normal:
+        need += BAND_BYTES
+    if source:
+        w, h = source
+        need += w * h * DECODE_BYTES_PER_PIXEL
+    need = int(need * MEMORY_HEADROOM)
+    limit = opts.memory_limit_mb << 20
+    if limit and need > limit:
+        raise Exception(f"{w}x{h} needs about {need >> 20} MB, over the {opts.memory_limit_mb} MB memory limit.")
+
+def band_rows(width, bytes_per_pixel, opts):
+    """
+    Rows per band so one band's temporaries stay within BAND_BYTES (or a
+    quarter of a smaller memory limit), whatever the image size.
+    """
+    budget = min(BAND_BYTES, (opts.memory_limit_mb << 20) // 4 or BAND_BYTES)
+    return max(1, budget // max(1, width * bytes_per_pixel))
+
+def texconv_bin(encode):
+    """The texconv binary these options would use, or None when the built-in encoder applies."""
+    if encode.texconv_path:
+        return encode.texconv_path if os.path.exists(encode.texconv_path) else None
+    bundled = resource_path("texconv.exe")
+    return bundled if os.name == 'nt' and os.path.exists(bundled) else None
+
+def use_texconv(encode):
+    return encode.encoder == "Auto" and texconv_bin(encode) is not None
+
+def save_img(img, out_path, has_alpha, encode, log=_noop_log):
+    with stage("encode", w=img.width, h=img.height, out=os.path.basename(out_path)) as rec:
+        if out_path.lower().endswith(".dds"):
+            if use_texconv(encode):
+                if encode.texconv_scratch:
+                    texconv_defer(img, out_path, has_alpha, encode)
+                else:
+                    texconv_save(img, out_path, has_alpha, encode)
+            else:
+                # Built-in BC1/BC3 encoder: same formats and mip handling as texconv, on every platform
+                fourcc = dds_codec.pick_format(encode.compress, has_alpha)
+                dds_codec.save_dds(img, out_path, fourcc, encode.mips, encode.mip_alpha_coverage)
+        else:
+            # Standard save for non-DDS files
+            img.save(out_path)
+        # Deferred texconv outputs don't exist yet; their time shows up in the batch's flush
+        rec["bytes_out"] = _file_bytes(out_path)
+
+# --- TEXCONV ---
+def texconv_format(compress, has_alpha):
+    # BC1 = DXT1 (No alpha), BC3 = DXT5 (Smooth alpha)
+    if compress == "Auto":
+        return "BC3_UNORM" if has_alpha else "BC1_UNORM"
+    elif compress == "DXT1":
+        return "BC1_UNORM"
+    elif compress == "DXT5":
+        return "BC3_UNORM"
+    return "B8G8R8A8_UNORM" # None
+
+def run_texconv(bin_path, fmt, mips, out_dir, inputs=(), flist=None, alpha_coverage=False):
+    # -m 0: Generate full mipmap chain, -m 1: Single level
+    # -y: Overwrite existing
+    # -f: Pixel format
+    cmd = [bin_path, "-f", fmt, "-y", "-o", out_dir, "-m", "0" if mips else "1"]
+    if mips and alpha_coverage:
+        cmd.extend(["-keepcoverage", str(dds_codec.ALPHA_TEST_REF / 255)])
+    if flist:
+        cmd.extend(["-flist", flist])
+    cmd.extend(inputs)
+
+    # Hide the console window when running the subprocess
+    startupinfo = None
+    if os.name == 'nt':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+    subprocess.run(cmd, check=True, startupinfo=startupinfo, capture_output=True)
+
+def texconv_save(img, out_path, has_alpha, encode):
+    # 1. Save a temp TGA (Lossless, handles alpha well)
+    temp_tga = out_path.replace(".dds", "_temp.tga")
+    with stage("temp_tga", w=img.width, h=img.height) as rec:
+        img.save(temp_tga)
+        rec["bytes_out"] = _file_bytes(temp_tga)
+
+    try:
+        fmt = texconv_format(encode.compress, has_alpha)
+        with stage("texconv"):
+            run_texconv(texconv_bin(encode), fmt, encode.mips, os.path.dirname(out_path), [temp_tga],
+                        alpha_coverage=encode.mip_alpha_coverage)
+
+        # texconv creates [filename].dds. If we saved temp as [name]_temp.tga,
+        # it creates [name]_temp.dds. Rename it to the final out_path.
+        generated_dds = temp_tga.replace(".tga", ".dds")
+        if os.path.exists(generated_dds):
+            with stage("rename"):
+                if os.path.exists(out_path): os.remove(out_path)
+                os.rename(generated_dds, out_path)
+
+    finally:
+        if os.path.exists(temp_tga): os.remove(temp_tga)
+
+# Queued encodes live in <scratch>/<format>_m<mips>_c<coverage>/<id>.tga, with <id>.txt holding
+# the final output path. Keeping the queue on disk lets worker processes add to it
+# without any shared state; the ids only need to be unique per process.
+_defer_ids = itertools.count()
+
+def texconv_defer(img, out_path, has_alpha, encode):
+    fmt = texconv_format(encode.compress, has_alpha)
+    group = f"{fmt}_m{int(encode.mips)}_c{int(encode.mip_alpha_coverage)}"
+    group_dir = os.path.join(encode.texconv_scratch, group)
+    os.makedirs(group_dir, exist_ok=True)
+    uid = f"{os.getpid()}_{next(_defer_ids)}"
+    with stage("temp_tga", w=img.width, h=img.height):
+        img.save(os.path.join(group_dir, uid + ".tga"))
+    with open(os.path.join(group_dir, uid + ".txt"), "w", encoding="utf-8") as f:
+        f.write(out_path)
+
+def flush_texconv(encode, log=_noop_log):
+    """
+    Runs texconv once per (format, mips) group queued in encode.texconv_scratch.
+    Returns (files written, output paths texconv failed to produce).
+    """
+    written = 0
+    failed = []
+    scratch = encode.texconv_scratch
+    for group in sorted(os.listdir(scratch)):
+        group_dir = os.path.join(scratch, group)
+        if not os.path.isdir(group_dir): continue
+        fmt, mip_flag, cov_flag = group.rsplit("_", 2)
+        uids = sorted(f[:-4] for f in os.listdir(group_dir) if f.endswith(".tga"))
+        if not uids: continue
+
+        flist = os.path.join(scratch, group + ".flist")
+        with open(flist, "w", encoding="utf-8") as f:
+            f.write("\n".join(os.path.join(group_dir, u + ".tga") for u in uids) + "\n")
+        try:
+            with stage("texconv", files=len(uids)):
+                run_texconv(texconv_bin(encode), fmt, mip_flag == "m1", group_dir, flist=flist,
+                            alpha_coverage=cov_flag == "c1")
+        except (OSError, subprocess.CalledProcessError) as e:
+            log(f"texconv failed for {len(uids)} {fmt} files: {e}")
+
+        for uid in uids:
+            with open(os.path.join(group_dir, uid + ".txt"), encoding="utf-8") as f:
+                out_path = f.read()
+            generated_dds = os.path.join(group_dir, uid + ".dds")
+            if os.path.exists(generated_dds):
+                os.replace(generated_dds, out_path)
+                written += 1
+            else:
+                failed.append(out_path)
+    return written, failed
+
+@contextmanager
+def texconv_batch(encode, log=_noop_log, failed=None):
+    """
+    Wraps a batch so every DDS that would go through texconv is queued in one
+    scratch directory and encoded on exit with one texconv run per pixel
+    format and mip setting. Yields the EncodeOptions the batch should use;
+    when texconv isn't in play they are returned unchanged. Outputs texconv
+    didn't produce are appended to `failed`, if given: their converter
+    already reported success, so the caller has to take that back.
+    """
+    if not (encode.batch_texconv and use_texconv(encode)):
+        yield encode
+        return
+    scratch = tempfile.mkdtemp(prefix="bzrtex_")
+    try:
+        yield replace(encode, texconv_scratch=scratch)
+        count, missing = flush_texconv(replace(encode, texconv_scratch=scratch), log)
+        log(f"texconv: encoded {count} DDS files.")
+        if failed is not None:
+            failed.extend(missing)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+# --- DERIVED MAPS ---
+def gen_derived_maps(img, dest, name, opts, log=_noop_log):
+    """
+    Generates every enabled _e/_s/_n map from one luminance pass, then encodes
+    them in turn, freeing each map once it is written.
+    """
+    if not (opts.gen_emissive or opts.gen_specular or opts.gen_normal):
+        return
+    with stage("derive_maps", w=img.width, h=img.height):
+        maps = derive_maps(np.asarray(img), np.asarray(img.convert("L")), opts)
+    for suffix in list(maps):
+        pixels = maps.pop(suffix)
+        save_img(Image.fromarray(pixels, "RGBA"), os.path.join(dest, f"{name}{suffix}{opts.to_ext}"), False, opts.encode, log)
+        del pixels
+
+def derive_maps(rgba, gray, opts):
+    """
+    {suffix: (H, W, 4) uint8} for the emissive, specular and normal maps
+    enabled in opts, all derived from the same luminance in one banded pass:
+    _e keeps the pixels brighter than emissive_thresh over opaque black,
+    _s is luminance times spec_contrast, _n is the height gradient.
+    """
+    h, w = gray.shape
+    maps = {suffix: np.empty((h, w, 4), dtype=np.uint8)
+            for enabled, suffix in ((opts.gen_emissive, "_e"), (opts.gen_specular, "_s"), (opts.gen_normal, "_n")) if enabled}
+    if not maps:
+        return maps
+    # Emissive and specular work on whole RGBA pixels viewed as little-endian words
+    opaque_black = np.uint32(0xFF000000)
+    pixels = np.ascontiguousarray(rgba, dtype=np.uint8).view("<u4")[..., 0]
+    spec = np.clip(np.trunc(np.arange(256) * opts.spec_contrast), 0, 255).astype(np.uint32)
+    spec_lut = (spec | (spec << 8) | (spec << 16) | opaque_black).astype("<u4")
+    rows = band_rows(w, NORMAL_BAND_BYTES_PER_PIXEL, opts)
+    for y0 in range(0, h, rows):
+        y1 = min(h, y0 + rows)
+        g = gray[y0:y1]
+        if "_e" in maps:
+            out = maps["_e"].view("<u4")[y0:y1, :, 0]
+            np.copyto(out, np.where(g > opts.emissive_thresh, pixels[y0:y1], opaque_black))
+        if "_s" in maps:
+            np.take(spec_lut, g, out=maps["_s"].view("<u4")[y0:y1, :, 0])
+        if "_n" in maps:
+            _normal_band(gray, y0, y1, opts.norm_strength, opts.norm_flip_y, maps["_n"])
+    return maps
+
+def _gradient(a, axis):
+    return np.gradient(a, axis=axis) if a.shape[axis] > 1 else np.zeros_like(a)
+
+def _normal_band(gray, y0, y1, strength, flip_y, out):
+    """
+    Fills rows y0:y1 of an (H, W, 4) normal map from a height image. The band
+    is read with a one-row halo, so the central differences match a
+    whole-image pass.
+    """
+    h = gray.shape[0]
+    a, b = max(0, y0 - 1), min(h, y1 + 1)
+    band = gray[a:b].astype(np.float32)
+    core = slice(y0 - a, y0 - a + (y1 - y0))
+    nx = _gradient(band, 1)[core] * -strength
+    ny = _gradient(band, 0)[core] * (strength if flip_y else -strength)
+    inv = 1.0 / np.sqrt(nx * nx + ny * ny + np.float32(255.0 * 255.0))
+    out[y0:y1, :, 0] = (nx * inv + 1.0) * 127.5
+    out[y0:y1, :, 1] = (ny * inv + 1.0) * 127.5
+    out[y0:y1, :, 2] = 255.0 * 255.0 * inv
+    out[y0:y1, :, 3] = 255
+
+# --- MAP ---
+def process_map_file(path, opts, output_folder=None, log=_noop_log):
+    base_name = os.path.basename(path)
+    file_no_ext = os.path.splitext(base_name)[0]
+    dest_dir = dest_dir_for(path, output_folder)
+
+    # 1. Determine active palette
+    active_pal = resolve_palette(opts)
+
+    if path.lower().endswith(".map"):
+        with open(path, 'rb') as f, stage("decode", bytes_in=_file_bytes(path)) as rec:
+            rb, fmt, h, _ = struct.unpack('<4H', f.read(8))
+            w = rb // BZMapFormat.bpp[fmt]
+            rec.update(w=w, h=h)
+            data = f.read()
+
+            img = Image.fromarray(decode_map_pixels(data, fmt, w, h, active_pal), "RGBA")
+
+        # Apply Scaling
+        scale_val = opts.scale
+        if scale_val != "No Scaling":
+            new_size = int(scale_val.split('x')[0])
+            with stage("rescale", w=new_size, h=new_size):
+                img = img.resize((new_size, new_size), Image.Resampling.LANCZOS)
+
+        png = os.path.join(dest_dir, file_no_ext + ".png")
+        with stage("save", w=img.width, h=img.height, out=os.path.basename(png)) as rec:
+            img.save(png)
+            rec["bytes_out"] = _file_bytes(png)
+        return f"Exported: {file_no_ext}.png"
+    else:
+        # PNG -> MAP
+        src = Image.open(path)
+        out = os.path.join(dest_dir, file_no_ext + ".map")
+        indexed = opts.out_format == "Indexed"
+
+        # Already palettized at the target size: carry the indices over instead of requantizing
+        if indexed and src.mode == "P" and opts.scale == "No Scaling":
+            with stage("remap", w=src.width, h=src.height, bytes_in=_file_bytes(path)):
+                indices = remap_indexed(src, active_pal)
+            write_map(out, indices, BZMapFormat.INDEXED)
+            return f"Packed: {file_no_ext}.map (indexed)"
+
+        with stage("decode", w=src.width, h=src.height, bytes_in=_file_bytes(path)):
+            img = src.convert("RGBA")
+
+        # Apply Scaling
+        scale_val = opts.scale
+        if scale_val != "No Scaling":
+            new_size = int(scale_val.split('x')[0])
+            with stage("rescale", w=new_size, h=new_size):
+                img = img.resize((new_size, new_size), Image.Resampling.LANCZOS)
+
+        rgba = np.asarray(img)
+        if indexed:
+            rgb = np.ascontiguousarray(rgba[..., :3])
+            with stage("quantize", w=img.width, h=img.height):
+                indices = dither_to_palette(rgb, active_pal) if opts.dither else quantize_to_palette(rgb, active_pal)
+            write_map(out, indices, BZMapFormat.INDEXED)
+            return f"Packed: {file_no_ext}.map (indexed)"
+
+        fmt = pick_map_format(opts.out_format, rgba)
+        with stage("encode", w=img.width, h=img.height):
+            pixels = encode_map_pixels(rgba, fmt)
+        write_map(out, pixels, fmt)
+        if fmt == BZMapFormat.ARGB8888:
+            return f"Packed: {file_no_ext}.map"
+        return f"Packed: {file_no_ext}.map ({BZMapFormat.names[fmt]})"
+
+# --- MAP PIXEL FORMATS ---
+# 16-bit formats are little-endian words: ARGB4444 = AAAARRRRGGGGBBBB, RGB565 = RRRRRGGGGGGBBBBB
+
+def _expand_bits(v, bits):
+    """n-bit channel values -> 0-255, replicating the high bits into the low ones."""
+    v = v.astype(np.uint16)
+    return ((v << (8 - bits)) | (v >> (2 * bits - 8))).astype(np.uint8)
+
+def _reduce_bits(v, bits):
+    """0-255 channel values -> nearest n-bit value."""
+    return (v.astype(np.uint32) * ((1 << bits) - 1) + 127) // 255
+
+def decode_map_pixels(data, fmt, w, h, palette=BUILTIN_MOON_PALETTE):
+    """Raw MAP pixel data -> (h, w, 4) RGBA uint8."""
+    n = w * h
+    if fmt == BZMapFormat.INDEXED:
+        indices = np.frombuffer(data, dtype=np.uint8, count=n).reshape(h, w)
+        return palette_lut(tuple(tuple(c) for c in palette))[indices]
+    if fmt in (BZMapFormat.ARGB8888, BZMapFormat.XRGB8888):
+        bgra = np.frombuffer(data, dtype=np.uint8, count=n * 4).reshape(h, w, 4)
+        rgba = bgra[..., [2, 1, 0, 3]]
+        if fmt == BZMapFormat.XRGB8888:
+            rgba[..., 3] = 255
+        return rgba
+    if fmt not in (BZMapFormat.ARGB4444, BZMapFormat.RGB565):
+        raise Exception(f"Unknown MAP format {fmt}.")
+    px = np.frombuffer(data, dtype="<u2", count=n).reshape(h, w)
+    rgba = np.empty((h, w, 4), dtype=np.uint8)
+    if fmt == BZMapFormat.ARGB4444:
+        for i, shift in enumerate((8, 4, 0, 12)):
+            rgba[..., i] = _expand_bits((px >> shift) & 0xF, 4)
+    else:
+        rgba[..., 0] = _expand_bits(px >> 11, 5)
+        rgba[..., 1] = _expand_bits((px >> 5) & 0x3F, 6)
+        rgba[..., 2] = _expand_bits(px & 0x1F, 5)
+        rgba[..., 3] = 255
+    return rgba
+
+def encode_map_pixels(rgba, fmt):
+    """(h, w, 4) RGBA uint8 -> pixel array laid out for a non-indexed MAP format."""
+    if fmt == BZMapFormat.ARGB8888:
+        return rgba[..., [2, 1, 0, 3]]
+    if fmt == BZMapFormat.XRGB8888:
+        bgrx = rgba[..., [2, 1, 0, 3]]
+        bgrx[..., 3] = 255
+        return bgrx
+    r, g, b, a = (rgba[..., i] for i in range(4))
+    if fmt == BZMapFormat.ARGB4444:
+        px = (_reduce_bits(a, 4) << 12) | (_reduce_bits(r, 4) << 8) | (_reduce_bits(g, 4) << 4) | _reduce_bits(b, 4)
+    elif fmt == BZMapFormat.RGB565:
+        px = (_reduce_bits(r, 5) << 11) | (_reduce_bits(g, 6) << 5) | _reduce_bits(b, 5)
+    else:
+        raise Exception(f"Cannot encode MAP format {fmt} from RGBA.")
+    return px.astype("<u2")
+
+def pick_map_format(name, rgba):
+    """BZMapFormat for an out_format setting; "Auto" is RGB565 when opaque, else ARGB4444."""
+    if name == "Auto":
+        opaque = rgba.size == 0 or rgba[..., 3].min() == 255
+        return BZMapFormat.RGB565 if opaque else BZMapFormat.ARGB4444
+    if name not in BZMapFormat.names:
+        raise Exception(f"Unknown MAP format '{name}'.")
+    return BZMapFormat.names.index(name)
+
+def write_map(out, pixels, fmt):
+    """Writes (H, W) or (H, W, C) pixel data already laid out in `fmt` as a .MAP."""
+    h, w = pixels.shape[:2]
+    with open(out, 'wb') as f, stage("write", w=w, h=h, out=os.path.basename(out), bytes_out=8 + pixels.nbytes):
+        f.write(struct.pack('<4H', w * BZMapFormat.bpp[fmt], fmt, h, 0))
+        f.write(np.ascontiguousarray(pixels))
+
+# --- LGT ---
+# Redux zones are 1280 world units wide
+ZONE_UNITS = 1280
+
+def read_trn_size(path):
+    """[Size] Width and Depth (or Height) of a .TRN in world units; missing values are 0."""
+    with open(path, 'r', errors='replace') as f:
+        content = f.read()
+    size = re.search(r'^\s*\[Size\](.*?)(?=^\s*\[|\Z)', content, re.S | re.M | re.I)
+    text = size.group(1) if size else content
+    def value(*keys):
+        for key in keys:
+            m = re.search(rf'^\s*{key}\s*=\s*(\d+)', text, re.M | re.I)
+            if m: return int(m.group(1))
+        return 0
+    return value("Width"), value("Depth", "Height")
+
+def trn_dimensions(path):
+    """Reads Width=XXXX from a .TRN and returns (world_width, zones_wide), or None."""
+    world_width, _ = read_trn_size(path)
+    if not world_width:
+        return None
+    return world_width, world_width // ZONE_UNITS
+
+def trn_grid(path):
+    """(zones_wide, zones_high) of a .TRN; zones_high is 0 if the file gives no depth."""
+    world_width, world_depth = read_trn_size(path)
+    if not world_width:
+        raise Exception(f"No Width in {os.path.basename(path)}.")
+    return world_width // ZONE_UNITS, world_depth // ZONE_UNITS
+
+class TerrainIndex:
+    """
+    Pairs every .LGT (and its exported .PNG) in a mission folder tree with the
+    .TRN it belongs to, so batches know each map's zone grid without a width
+    being typed in. Terrain sizes are parsed once and reused until the .TRN
+    changes on disk.
+    """
+    def __init__(self):
+        self._grids = {}     # trn path -> (mtime_ns, grid)
+        self.terrains = {}   # folder -> {stem: trn path}
+        self.lightmaps = []
+        self.images = []
+
+    def scan(self, root, include=(), exclude=(), recursive=True):
+        """Walks root once, collecting terrains, lightmaps and lightmap PNGs."""
+        self.terrains = {}
+        lgts, pngs = [], []
+        include = tuple(p.lower() for p in include)
+        for p in iter_sources(root, (".trn", ".lgt", ".png"), (), exclude, recursive):
+            folder, name = os.path.split(p)
+            stem, ext = os.path.splitext(name.lower())
+            if ext == ".trn":
+                self.terrains.setdefault(folder, {})[stem] = p
+                continue
+            rel = os.path.relpath(p, root).replace(os.sep, "/").lower()
+            if include and not _glob_match(rel, name.lower(), include):
+                continue
+            (lgts if ext == ".lgt" else pngs).append(p)
+        lgt_keys = {os.path.splitext(p.lower())[0] for p in lgts}
+        self.lightmaps = lgts
+        # Only PNGs that belong to a lightmap or a terrain, not every texture in the folder
+        self.images = [p for p in pngs if os.path.splitext(p.lower())[0] in lgt_keys
+                       or os.path.splitext(os.path.basename(p).lower())[0] in self.terrains.get(os.path.dirname(p), {})]
+        return self
+
+    def terrain_for(self, path):
+        """The .TRN named like `path`, else the only .TRN in its folder."""
+        folder, name = os.path.split(path)
+        trns = self.terrains.get(folder, {})
+        stem = os.path.splitext(name.lower())[0]
+        if stem in trns:
+            return trns[stem]
+        return next(iter(trns.values())) if len(trns) == 1 else None
+
+    def grid_for(self, path):
+        """(zones_wide, zones_high) for a lightmap, or None without a terrain."""
+        trn = self.terrain_for(path)
+        if trn is None:
+            return None
+        mtime = os.stat(trn).st_mtime_ns
+        cached = self._grids.get(trn)
+        if cached is None or cached[0] != mtime:
+            cached = self._grids[trn] = (mtime, trn_grid(trn))
+        return cached[1]
+
+    def options_for(self, path):
+        grid = self.grid_for(path)
+        return LGTOptions(width=grid[0], height=grid[1]) if grid else LGTOptions()
+
+def lgt_grid(path, width=0, height=0):
+    """(zones_wide, zones_high) of an .LGT; with no width, a square map is assumed."""
+    # ZONE_RES is 256 for Redux. Chunks are 128x128 in legacy.
+    total_chunks = os.path.getsize(path) // (ZONE_RES * ZONE_RES)
+    map_chunks = total_chunks - 1
+
+    if map_chunks <= 0:
+        raise Exception("File too small to contain map data.")
+
+    if width > 0 and height > 0 and width * height != map_chunks:
+        raise Exception(f"Terrain is {width}x{height} zones but the file holds {map_chunks}.")
+    gw = width
+    if gw <= 0: gw = map_chunks // height if height > 0 else int(math.sqrt(map_chunks))
+    gh = map_chunks // gw if gw > 0 else 0
+    if gh <= 0:
+        raise Exception(f"{map_chunks} zones cannot fill a map {gw} zones wide.")
+    return gw, gh
+
+def read_lgt(path, width=0, height=0):
+    """
+    Returns the lightmap as one top-down (H, W) uint8 array. The zones are
+    memory-mapped past the border chunk and stitched with a single
+    transpose, so the only copy made is the finished image.
+    """
+    gw, gh = lgt_grid(path, width, height)
+    # Zones are stored row by row, each one ZONE_RES x ZONE_RES
+    zones = np.memmap(path, dtype=np.uint8, mode='r', offset=ZONE_RES * ZONE_RES,
+                      shape=(gh, gw, ZONE_RES, ZONE_RES))
+    # Stitch into one image and flip North/South in the same copy
+    full = np.ascontiguousarray(zones.transpose(0, 2, 1, 3).reshape(gh * ZONE_RES, gw * ZONE_RES)[::-1])
+    # full is a copy, so this drops the last reference to the mapping and unmaps
+    # the file now; the .lgt can then be overwritten (Windows)
+    del zones
+    return full
+
+def lgt_to_png(path, opts, log=_noop_log):
+    with stage("read", bytes_in=_file_bytes(path)) as rec:
+        full = read_lgt(path, opts.width, opts.height)
+        rec.update(w=full.shape[1], h=full.shape[0])
+    gh, gw = full.shape[0] // ZONE_RES, full.shape[1] // ZONE_RES
+    out = os.path.splitext(path)[0] + ".png"
+    with stage("save", w=full.shape[1], h=full.shape[0], out=os.path.basename(out)) as rec:
+        Image.fromarray(full, 'L').save(out)
+        rec["bytes_out"] = _file_bytes(out)
+    return f"Exported {gw}x{gh} map. Top-Down segment order applied."
+
+# Larger maps are written one row of zones at a time instead of in one piece
+LGT_STREAM_BYTES = 64 << 20
+
+def write_lgt(out, img):
+    """
+    Writes a top-down (H, W) uint8 lightmap as .LGT: one border chunk, then
+    the zones in storage order. Only whole zones are packed.
+    """
+    # Flip North/South to match internal storage format
+    flipped = np.asarray(img, dtype=np.uint8)[::-1]
+    gw, gh = flipped.shape[1] // ZONE_RES, flipped.shape[0] // ZONE_RES
+    zones = flipped[:gh * ZONE_RES, :gw * ZONE_RES].reshape(gh, ZONE_RES, gw, ZONE_RES).transpose(0, 2, 1, 3)
+
+    # Border takes the first stored pixel (the image's bottom-left corner)
+    border_color = flipped[0, 0] if flipped.size else 0
+    chunk = ZONE_RES * ZONE_RES
+    with open(out, 'wb') as f:
+        if zones.nbytes <= LGT_STREAM_BYTES:
+            # Lay the whole file out in one buffer and write it once
+            buf = np.empty(chunk + zones.nbytes, dtype=np.uint8)
+            buf[:chunk] = border_color
+            buf[chunk:].reshape(zones.shape)[...] = zones
+            f.write(buf)
+        else:
+            f.write(np.full(chunk, border_color, dtype=np.uint8))
+            for row in zones:
+                f.write(np.ascontiguousarray(row))
+    return gw, gh
+
+def png_to_lgt(path, opts=None, log=_noop_log):
+    with Image.open(path) as img, stage("decode", w=img.width, h=img.height, bytes_in=_file_bytes(path)):
+        gray = np.asarray(img.convert('L'))
+    if opts and opts.width > 0:
+        gw, gh = gray.shape[1] // ZONE_RES, gray.shape[0] // ZONE_RES
+        if gw != opts.width or (opts.height > 0 and gh != opts.height):
+            raise Exception(f"Image is {gw}x{gh} zones but the terrain is {opts.width}x{opts.height or '?'}.")
+    out = os.path.splitext(path)[0] + ".lgt"
+    with stage("write", w=gray.shape[1], h=gray.shape[0], out=os.path.basename(out)) as rec:
+        gw, gh = write_lgt(out, gray)
+        rec["bytes_out"] = _file_bytes(out)
+    return f"Packed {gw*gh} zones into .LGT (Top-Down)."
+
+# --- DXTBZ2 ---
+def read_dxtbz2(path):
+    """Reads a DXTBZ2 header and its compressed mip chunks, largest first."""
+    with open(path, "rb") as f:
+        header = DXTBZ2Header()
+        f.readinto(header)
+
+        # Each mip is a uint32 chunk size followed by the raw DXT blocks
+        levels = []
+        for _ in range(max(1, header.m_NumMips)):
+            size_raw = f.read(4)
+            if len(size_raw) < 4: break
+            chunk_size = struct.unpack("I", size_raw)[0]
+            data = f.read(chunk_size)
+            if len(data) < chunk_size: break
+            levels.append(data)
+    return header, levels
+
+def dxtbz2_passthrough_levels(header, levels, fourcc, mips):
+    return passthrough_levels(header.m_BaseWidth, header.m_BaseHeight, levels, fourcc, mips)
+
+def passthrough_levels(w, h, levels, fourcc, mips):
+    """
+    The stored mips (largest first, starting at w x h) that can go into a DDS
+    unchanged, or None if they can't satisfy the request without re-encoding
+    (bad sizes, or mips wanted but only the base level stored).
+    """
+    keep = []
+    for i, data in enumerate(levels if mips else levels[:1]):
+        if len(data) != dds_codec.level_size(fourcc, max(1, w >> i), max(1, h >> i)): break
+        keep.append(data)
+    if not keep or (mips and len(keep) == 1 and (w > 1 or h > 1)):
+        return None
+    return keep
+
+def process_dxtbz2(path, opts, log=_noop_log):
+    """Converts dxtbz2 to DDS/PNG. Matching DXT formats are copied block-for-block; anything else is re-encoded."""
+    base_name = os.path.basename(path)
+    file_no_ext = os.path.splitext(base_name)[0]
+    out_ext = opts.out_ext
+    final_out = os.path.join(os.path.dirname(path), file_no_ext + out_ext)
+
+    if os.path.exists(final_out) and not opts.overwrite:
+        return f"Skipped: {file_no_ext}{out_ext} exists."
+
+    with stage("read", bytes_in=_file_bytes(path)) as rec:
+        header, levels = read_dxtbz2(path)
+        rec.update(w=header.m_BaseWidth, h=header.m_BaseHeight)
+    if not levels: return "Error: Empty file"
+    raw_data = levels[0]
+
+    # Check for alpha based on data density
+    has_alpha = len(raw_data) // header.m_BaseHeight == header.m_BaseWidth
+    src_fourcc = b"DXT5" if has_alpha else b"DXT1"
+
+    # Same block format in and out: copy the compressed mips straight into the container
+    if out_ext == ".dds" and dds_codec.pick_format(opts.encode.compress, has_alpha) == src_fourcc:
+        keep = dxtbz2_passthrough_levels(header, levels, src_fourcc, opts.encode.mips)
+        if keep:
+            with stage("copy_mips", w=header.m_BaseWidth, h=header.m_BaseHeight, out=os.path.basename(final_out)) as rec:
+                dds_codec.write_dds(final_out, header.m_BaseWidth, header.m_BaseHeight, src_fourcc, keep)
+                rec["bytes_out"] = _file_bytes(final_out)
+            return f"Converted: {file_no_ext} -> {out_ext} (copied {len(keep)} mip level(s), no re-encode)"
+
+    # Decode the base level in memory and run it through the regular encoder
+    with stage("decode", w=header.m_BaseWidth, h=header.m_BaseHeight):
+        rgba = dds_codec.decode_level(raw_data, src_fourcc, header.m_BaseWidth, header.m_BaseHeight)
+    save_img(Image.fromarray(rgba, "RGBA"), final_out, has_alpha, opts.encode, log)
+
+    return f"Converted: {file_no_ext} -> {out_ext}"
+
+# --- CHANNEL PACKER ---
+def pack_channels(rgb_p, a_p, out_p, log=_noop_log):
+    rgb_img = Image.open(rgb_p).convert("RGB")
+    alpha_img = Image.open(a_p).convert("L")
+
+    if rgb_img.size != alpha_img.size:
+        log(f"Resizing Alpha {alpha_img.size} to match RGB {rgb_img.size}...")
+        alpha_img = alpha_img.resize(rgb_img.size, Image.Resampling.LANCZOS)
+
+    rgb_img.putalpha(alpha_img)
+    rgb_img.save(out_p)
+    return f"Success: Saved RGBA to {out_p}"
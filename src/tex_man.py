@@ -1,11 +1,14 @@
-import os, struct, math, sys, subprocess, ctypes, json
+import os, sys, subprocess, ctypes, json, tempfile
+from collections import deque
 import tkinter as tk
 from tkinter import filedialog, messagebox, colorchooser, ttk
 from PIL import Image, ImageTk
-import imageio.v3 as iio
-import numpy as np
 import threading
-from ctypes import Structure, c_uint32, c_int, c_uint, c_ubyte
+from dataclasses import replace
+from contextlib import contextmanager
+import tex_engine as engine
+from tex_engine import (BUILTIN_MOON_PALETTE, EncodeOptions, TextureOptions, MapOptions, DXTOptions,
+                        LGTOptions)
 
 try:
     from tkinterdnd2 import DND_FILES, TkinterDnD
@@ -42,17 +45,6 @@ def load_custom_font(font_path):
         return True
     return False
 
-class DXTBZ2Header(Structure):
-    _fields_ = [
-        ("m_Sig", c_int), ("m_DXTLevel", c_int),
-        ("m_1x1Red", c_ubyte), ("m_1x1Green", c_ubyte),
-        ("m_1x1Blue", c_ubyte), ("m_1x1Alpha", c_ubyte),
-        ("m_NumMips", c_int), ("m_BaseHeight", c_int), ("m_BaseWidth", c_int)
-    ]
-
-# --- BZ98 ENGINE CONSTANTS ---
-ZONE_RES = 256  # Redux Standard (256x256 per zone)
-
 # --- BATTLEZONE HUD COLORS ---
 BZ_BG = "#0a0a0a"
 BZ_FG = "#d4d4d4"
@@ -61,71 +53,145 @@ BZ_DARK_GREEN = "#004400"
 BZ_CYAN = "#00ffff"
 
 CONFIG_FILE = "tex_man_config.json"
+BUILD_CACHE_FILE = "tex_man_build_cache.json"
+THUMB_CACHE_DIR = "tex_man_thumbs"
+TRACE_FILE = "tex_man_trace.jsonl"
+PAL_CELL = 22  # Pixels per swatch in the ACT editor grid, gap included
+
+def rgb_hex(rgb):
+    r, g, b = rgb[:3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+class LogChannel:
+    """
+    Thread-safe log (and optional progress bar) for one tk.Text. Any thread
+    may write; the UI drains the queue on a timer with one insert per tick,
+    keeps only the newest max_lines on screen and spools every line to a temp
+    file so the full log can still be saved.
+    """
+    def __init__(self, root, textbox, progress=None, interval_ms=100, max_lines=5000):
+        self.root = root
+        self.textbox = textbox
+        self.progress = progress
+        self.interval_ms = interval_ms
+        self.max_lines = max_lines
+        self.queue = deque()  # append/popleft are atomic, no lock needed
+        self.pending_progress = None
+        self.spool = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self.root.after(self.interval_ms, self.drain)
+
+    def write(self, message):
+        self.queue.append(message)
+
+    def set_progress(self, value):
+        # Only the latest value matters; the bar is updated at most once per tick
+        self.pending_progress = value
+
+    def drain(self):
+        lines = []
+        while self.queue:
+            lines.append(f"> {self.queue.popleft()}\n")
+        if lines:
+            self.spool.writelines(lines)
+            box = self.textbox
+            box.insert("end", "".join(lines[-self.max_lines:]))
+            excess = int(box.index("end-1c").split(".")[0]) - 1 - self.max_lines
+            if excess > 0:
+                box.delete("1.0", f"{excess + 1}.0")
+            box.see("end")
+        value, self.pending_progress = self.pending_progress, None
+        if value is not None and self.progress is not None:
+            self.progress.configure(value=value)
+        self.root.after(self.interval_ms, self.drain)
+
+    def clear(self):
+        self.textbox.delete("1.0", "end")
+
+    def save(self, path):
+        self.spool.flush()
+        self.spool.seek(0)
+        with open(path, "w", encoding="utf-8") as f:
+            while True:
+                chunk = self.spool.read(1 << 20)
+                if not chunk: break
+                f.write(chunk)
+        self.spool.seek(0, os.SEEK_END)
+
+class BatchJob:
+    """One queued batch: its pause/cancel switch, throughput meter and file count."""
+    def __init__(self, name, trace=False):
+        self.name = name
+        self.trace = trace  # Record per-stage timings (see engine.stage)
+        self.control = engine.BatchControl()
+        self.meter = engine.BatchMeter(self.control)
+        self.scan = None  # engine.ScanAhead feeding the batch, if any
+        self._total = 0
+
+    @property
+    def total(self):
+        """Files this batch will process: from the scan running ahead, else as set by the batch."""
+        return self.scan.found if self.scan else self._total
+
+    @total.setter
+    def total(self, value):
+        self._total = value
+
+    @property
+    def counting(self):
+        """True while the scan is still finding files, so the total (and ETA) may grow."""
+        return self.scan is not None and not self.scan.done
+
+    def status(self):
+        return self.meter.status(self.total, final=not self.counting)
+
+class JobManager:
+    """
+    Runs the batches of every tab one after another on a single background
+    thread, so a second batch queues instead of racing the first. The UI
+    polls `current` and `pending` on a timer.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.current = None
+        self.thread = None
+
+    def submit(self, name, func, *args, trace=False, log=None):
+        """
+        Queues func(job, *args); func must only use values captured on the main
+        thread. An error that ends the batch is written to `log` (thread-safe).
+        """
+        with self.lock:
+            self.pending.append((BatchJob(name, trace), func, args, log))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            with self.lock:
+                if not self.pending:
+                    self.current = self.thread = None
+                    return
+                job, func, args, log = self.pending.popleft()
+                self.current = job
+            try:
+                func(job, *args)
+            except Exception as e:
+                (log or print)(f"Batch Error ({job.name}): {e}")
+
+    def toggle_pause(self):
+        job = self.current
+        if job is None: return
+        if job.control.paused: job.control.resume()
+        else: job.control.pause()
 
-class BZMapFormat:
-    INDEXED, ARGB4444, RGB565, ARGB8888, XRGB8888 = 0, 1, 2, 3, 4
-    bpp = [1, 2, 2, 4, 4]
-
-# Full 256-color Moon.act data extracted from BZ98R Toolkit
-BUILTIN_MOON_PALETTE = [
-    (0, 0, 0), (17, 16, 16), (26, 24, 24), (31, 26, 25), (36, 35, 31), (50, 42, 36),
-    (52, 49, 48), (60, 56, 56), (68, 64, 64), (77, 72, 72), (85, 80, 80), (84, 79, 76),
-    (112, 108, 104), (116, 129, 125), (133, 138, 133), (178, 174, 174), (191, 188, 188),
-    (204, 201, 201), (217, 215, 215), (229, 228, 228), (255, 255, 255), (20, 3, 2),
-    (40, 6, 3), (59, 10, 5), (79, 13, 6), (99, 16, 8), (107, 0, 8), (148, 8, 0),
-    (140, 33, 8), (148, 16, 0), (156, 24, 0), (173, 57, 0), (189, 82, 8), (206, 99, 16),
-    (200, 94, 11), (214, 101, 0), (214, 132, 33), (222, 123, 24), (231, 140, 33),
-    (231, 156, 41), (239, 173, 57), (222, 156, 49), (222, 165, 57), (222, 165, 74),
-    (231, 173, 99), (239, 189, 90), (247, 198, 82), (239, 206, 115), (249, 249, 149),
-    (235, 230, 97), (183, 180, 81), (169, 133, 50), (131, 124, 45), (123, 99, 39),
-    (149, 101, 17), (87, 59, 2), (80, 67, 28), (78, 48, 3), (53, 40, 12), (36, 24, 5),
-    (171, 72, 69), (169, 168, 158), (153, 150, 139), (249, 249, 195), (223, 216, 188),
-    (200, 189, 151), (194, 186, 139), (186, 172, 145), (167, 164, 145), (160, 151, 127),
-    (175, 168, 134), (160, 145, 106), (157, 145, 109), (136, 130, 107), (132, 125, 80),
-    (116, 104, 81), (96, 94, 83), (84, 73, 55), (115, 72, 1), (106, 81, 30),
-    (109, 118, 109), (93, 106, 102), (79, 96, 90), (68, 91, 86), (63, 76, 73),
-    (62, 63, 57), (48, 70, 67), (46, 61, 56), (37, 59, 54), (34, 50, 45), (31, 42, 41),
-    (24, 36, 32), (19, 23, 21), (16, 14, 14), (15, 10, 6), (7, 11, 9), (181, 191, 204),
-    (150, 156, 172), (139, 149, 164), (134, 143, 156), (125, 134, 150), (120, 130, 143),
-    (115, 124, 139), (112, 129, 150), (111, 120, 135), (107, 116, 131), (106, 124, 145),
-    (101, 117, 141), (100, 111, 128), (100, 108, 123), (96, 108, 123), (96, 104, 120),
-    (95, 112, 135), (92, 104, 119), (92, 100, 116), (91, 108, 131), (88, 100, 115),
-    (88, 96, 112), (85, 104, 127), (84, 96, 111), (84, 92, 108), (83, 100, 123),
-    (80, 96, 119), (80, 92, 108), (80, 88, 104), (76, 96, 119), (76, 92, 116),
-    (76, 92, 110), (76, 84, 100), (75, 88, 103), (74, 88, 108), (72, 92, 115),
-    (72, 88, 112), (72, 84, 104), (72, 84, 99), (72, 80, 95), (68, 88, 112),
-    (68, 84, 108), (68, 80, 100), (68, 76, 92), (67, 84, 102), (67, 80, 95),
-    (64, 84, 108), (64, 80, 104), (64, 76, 96), (64, 72, 87), (63, 80, 100),
-    (63, 76, 91), (60, 80, 104), (60, 76, 104), (60, 76, 100), (60, 72, 92),
-    (60, 68, 83), (59, 76, 96), (59, 72, 87), (56, 76, 100), (56, 72, 100),
-    (56, 72, 96), (56, 64, 79), (55, 72, 92), (55, 68, 83), (53, 68, 88),
-    (52, 72, 96), (52, 68, 96), (52, 68, 92), (52, 64, 88), (52, 60, 75),
-    (51, 64, 79), (49, 64, 84), (48, 68, 92), (48, 64, 92), (48, 60, 84),
-    (47, 64, 88), (47, 60, 75), (47, 56, 72), (46, 56, 68), (45, 60, 88),
-    (45, 60, 80), (44, 56, 79), (44, 52, 68), (44, 51, 64), (43, 60, 84),
-    (40, 56, 80), (40, 56, 76), (40, 52, 76), (40, 48, 64), (40, 48, 60),
-    (40, 44, 60), (36, 52, 72), (36, 51, 76), (36, 48, 72), (36, 40, 56),
-    (35, 44, 60), (33, 41, 56), (31, 38, 53), (28, 36, 49), (26, 33, 45),
-    (24, 30, 41), (22, 27, 38), (20, 24, 34), (17, 22, 30), (15, 19, 26),
-    (13, 16, 23), (11, 13, 19), (9, 10, 15), (6, 8, 11), (4, 5, 8), (2, 2, 4),
-    (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0),
-    (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0),
-    (0, 0, 0), (0, 0, 0), (0, 255, 255), (0, 127, 127), (0, 63, 63),
-    (78, 194, 242), (14, 153, 240), (7, 109, 222), (12, 149, 203), (6, 102, 171),
-    (6, 93, 136), (3, 56, 124), (26, 35, 80), (0, 127, 255), (0, 99, 199),
-    (0, 70, 141), (0, 34, 69), (0, 21, 42), (0, 255, 0), (0, 127, 0), (0, 63, 0),
-    (0, 31, 0), (0, 15, 0), (255, 0, 0), (127, 0, 0), (63, 0, 0), (31, 0, 0),
-    (15, 0, 0), (255, 255, 0), (164, 164, 0), (127, 127, 0), (80, 80, 0),
-    (64, 64, 0), (255, 0, 255)
-]
-def resource_path(relative_path):
-    """ Get absolute path to resource, works for dev and for PyInstaller """
-    try:
-        # PyInstaller creates a temp folder and stores path in _MEIPASS
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+    def cancel(self, clear_queue=False):
+        with self.lock:
+            if clear_queue:
+                self.pending.clear()
+            if self.current:
+                self.current.control.cancel()
 
 class ToolTip:
     def __init__(self, widget, text):
@@ -188,10 +254,23 @@ class BZReduxSuite:
         self.config = self.load_config()
         # Load the Moon Palette as default
         self.palette = [list(c) for c in BUILTIN_MOON_PALETTE]
-        self.pal_buttons = []
+        # Palette swatches are persistent canvas items; edits recolour only what changed
+        self.pal_cells = []
+        self.pal_cell_colors = [None] * 256
+        self.pal_strip_items = []
+        self.pal_strip_colors = [None] * 256
+        self.pal_strip_custom = False
         self.selected_index = None
+        self.log_channels = {}
+        self.jobs = JobManager()
+        # Texture previews decode on a loader thread; Tk only ever shows finished thumbnails
+        self.thumb_cache = engine.ThumbnailCache(THUMB_CACHE_DIR)
+        self.preview_lock = threading.Lock()
+        self.preview_pending = None
+        self.preview_busy = False
         
         self.notebook = ttk.Notebook(self.root)
+        self.setup_job_bar()
         self.notebook.pack(padx=10, pady=10, fill="both", expand=True)
         
         self.tab_act = ttk.Frame(self.notebook)
@@ -222,6 +301,16 @@ class BZReduxSuite:
         self.tex_auto_alpha = tk.BooleanVar(value=self.config.get("tex_auto_alpha", True))
         self.tex_batch_out = tk.StringVar(value=self.config.get("tex_batch_out", "[Same as Source]"))
         self.tex_from_ext = tk.StringVar(value=self.config.get("tex_from_ext", "all supported"))
+        self.tex_workers = tk.StringVar(value=str(self.config.get("tex_workers", engine.default_workers())))
+        self.lgt_workers = tk.StringVar(value=str(self.config.get("lgt_workers", engine.default_workers())))
+        self.tex_batch_texconv = tk.BooleanVar(value=self.config.get("tex_batch_texconv", True))
+        self.tex_memory_limit = tk.StringVar(value=str(self.config.get("tex_memory_limit", 2048)))
+        # Shared by every batch tab
+        self.incremental = tk.BooleanVar(value=self.config.get("incremental", False))
+        self.batch_trace = tk.BooleanVar(value=self.config.get("batch_trace", False))
+        self.batch_recursive = tk.BooleanVar(value=self.config.get("batch_recursive", True))
+        self.batch_include = tk.StringVar(value=self.config.get("batch_include", ""))
+        self.batch_exclude = tk.StringVar(value=self.config.get("batch_exclude", ""))
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
@@ -232,6 +321,40 @@ class BZReduxSuite:
         self.setup_dxt_tab()
         self.setup_pack_tab()
 
+    def setup_job_bar(self):
+        """Shared status, pause and cancel for whichever batch is running (packed below the tabs)."""
+        bar = ttk.Frame(self.root)
+        bar.pack(side="bottom", fill="x", padx=10, pady=(0, 10))
+        self.job_status = tk.StringVar(value="No batch running.")
+        self.job_progress = ttk.Progressbar(bar, style="BZ.Horizontal.TProgressbar", mode="determinate", length=240)
+        self.job_progress.pack(side="left", padx=5)
+        ttk.Label(bar, textvariable=self.job_status).pack(side="left", padx=5, fill="x", expand=True)
+        cancel_all = ttk.Button(bar, text="Cancel All", command=lambda: self.jobs.cancel(clear_queue=True))
+        cancel_all.pack(side="right", padx=2)
+        ToolTip(cancel_all, "Cancel the running batch and drop every queued one.")
+        ttk.Button(bar, text="Cancel", command=self.jobs.cancel).pack(side="right", padx=2)
+        self.job_pause_btn = ttk.Button(bar, text="Pause", command=self.jobs.toggle_pause)
+        self.job_pause_btn.pack(side="right", padx=2)
+        ToolTip(self.job_pause_btn, "Pause and cancel take effect between files;\nfiles already converting are finished first.")
+        self.root.after(250, self.update_job_bar)
+
+    def update_job_bar(self):
+        job = self.jobs.current
+        queued = len(self.jobs.pending)
+        if job is None:
+            self.job_status.set("No batch running.")
+            self.job_progress.configure(value=0)
+            self.job_pause_btn.configure(text="Pause")
+        else:
+            state = "cancelling" if job.control.cancelled else "paused" if job.control.paused else ""
+            text = f"{job.name}: {job.status()}"
+            if state: text += f" ({state})"
+            if queued: text += f" | {queued} queued"
+            self.job_status.set(text)
+            self.job_progress.configure(value=100 * job.meter.files / max(1, job.total))
+            self.job_pause_btn.configure(text="Resume" if job.control.paused else "Pause")
+        self.root.after(250, self.update_job_bar)
+
     def load_config(self):
         if os.path.exists(CONFIG_FILE):
             try:
@@ -251,7 +374,20 @@ class BZReduxSuite:
             "tex_scale_cutoff": self.tex_scale_cutoff.get(),
             "tex_auto_alpha": self.tex_auto_alpha.get(),
             "tex_batch_out": self.tex_batch_out.get(),
-            "tex_from_ext": self.tex_from_ext.get()
+            "tex_from_ext": self.tex_from_ext.get(),
+            "tex_workers": self.tex_workers.get(),
+            "lgt_workers": self.lgt_workers.get(),
+            "tex_encoder": self.tex_encoder.get(),
+            "tex_batch_texconv": self.tex_batch_texconv.get(),
+            "tex_memory_limit": self.tex_memory_limit.get(),
+            "tex_mip_coverage": self.tex_mip_coverage.get(),
+            "incremental": self.incremental.get(),
+            "batch_trace": self.batch_trace.get(),
+            "map_format": self.map_format_var.get(),
+            "map_dither": self.map_dither.get(),
+            "batch_recursive": self.batch_recursive.get(),
+            "batch_include": self.batch_include.get(),
+            "batch_exclude": self.batch_exclude.get()
         }
         try:
             with open(CONFIG_FILE, 'w') as f: json.dump(cfg, f, indent=4)
@@ -286,9 +422,29 @@ class BZReduxSuite:
         style.configure("TCombobox", fieldbackground="#1a1a1a", foreground=BZ_CYAN, arrowcolor=BZ_GREEN)
         style.map("TCombobox", fieldbackground=[("readonly", "#1a1a1a")], foreground=[("readonly", BZ_CYAN)])
 
+    def make_log(self, parent, height, progress=None):
+        """A log box whose messages go through a LogChannel; right-click to save or clear."""
+        textbox = tk.Text(parent, height=height, bg="#050505", fg=BZ_FG, font=("Consolas", 9))
+        channel = LogChannel(self.root, textbox, progress)
+        self.log_channels[textbox] = channel
+        menu = tk.Menu(textbox, tearoff=0)
+        menu.add_command(label="Save Log...", command=lambda: self.save_log(channel))
+        menu.add_command(label="Clear", command=channel.clear)
+        textbox.bind("<Button-3>", lambda e: menu.tk_popup(e.x_root, e.y_root))
+        textbox.bind("<Button-2>" if sys.platform == "darwin" else "<Control-Button-1>", lambda e: menu.tk_popup(e.x_root, e.y_root))
+        return textbox
+
+    def save_log(self, channel):
+        path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text", "*.txt")])
+        if not path: return
+        try:
+            channel.save(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save log: {e}")
+
     def log_msg(self, textbox, message):
-        textbox.insert("end", f"> {message}\n")
-        textbox.see("end")
+        # Safe from any thread; shows up on the channel's next drain tick
+        self.log_channels[textbox].write(message)
 
 # --- ACT PALETTE EDITOR ---
     def setup_act_tab(self):
@@ -301,16 +457,12 @@ class BZReduxSuite:
         grid_f = ttk.Frame(main_f)
         grid_f.pack(side="left", padx=20, pady=20)
         
-        self.pal_buttons = []
-        for i in range(256):
-            r, g, b = self.palette[i]
-            # Using standard tk.Button for background color support
-            btn = tk.Button(grid_f, text="", width=2, height=1, 
-                                bg=f"#{r:02x}{g:02x}{b:02x}",
-                                relief="flat",
-                                command=lambda x=i: self.select_palette_color(x))
-            btn.grid(row=i // 16, column=i % 16, padx=1, pady=1)
-            self.pal_buttons.append(btn)
+        self.pal_grid = tk.Canvas(grid_f, width=16 * PAL_CELL, height=16 * PAL_CELL, bg=BZ_BG, highlightthickness=0, cursor="hand2")
+        self.pal_grid.pack()
+        self.pal_cells = [self.pal_grid.create_rectangle(*self.pal_cell_box(i), outline="") for i in range(256)]
+        self.pal_highlight = self.pal_grid.create_rectangle(0, 0, 0, 0, outline="white", width=3, state="hidden")
+        self.pal_grid.bind("<Button-1>", self.on_pal_grid_click)
+        self.paint_pal_grid()
 
         # 2. Middle: Quick Jump Shortcuts (Fixed width/height arguments)
         jump_f = ttk.Frame(main_f, width=140)
@@ -360,6 +512,26 @@ class BZReduxSuite:
         ttk.Button(ctrl_f, text="SAVE .ACT", style="Action.TButton", command=self.save_act).pack(fill="x")
         ttk.Button(ctrl_f, text="Import from Image", command=self.import_palette_from_image).pack(fill="x", pady=10)
 
+    def pal_cell_box(self, idx):
+        x, y = (idx % 16) * PAL_CELL, (idx // 16) * PAL_CELL
+        return x + 1, y + 1, x + PAL_CELL - 1, y + PAL_CELL - 1
+
+    def recolor_swatches(self, canvas, items, shown, palette, indices=None):
+        """Sets the fill of each swatch whose colour changed; `shown` caches what's on screen."""
+        for i in (range(256) if indices is None else indices):
+            color = rgb_hex(palette[i])
+            if shown[i] != color:
+                shown[i] = color
+                canvas.itemconfigure(items[i], fill=color)
+
+    def paint_pal_grid(self, indices=None):
+        self.recolor_swatches(self.pal_grid, self.pal_cells, self.pal_cell_colors, self.palette, indices)
+
+    def on_pal_grid_click(self, event):
+        col, row = event.x // PAL_CELL, event.y // PAL_CELL
+        if 0 <= col < 16 and 0 <= row < 16:
+            self.select_palette_color(row * 16 + col)
+
     def jump_to_index(self, idx):
         """Logic to handle the quick jump buttons without crashing"""
         self.select_palette_color(idx)
@@ -399,21 +571,17 @@ class BZReduxSuite:
         self.b_val.set(b)
         self.hex_var.set(f"#{r:02x}{g:02x}{b:02x}")
         
-        # Visual feedback: Reset all borders, then highlight the selected one
-        for i, btn in enumerate(self.pal_buttons):
-            if i == idx:
-                btn.configure(relief="solid", bd=4)
-            else:
-                btn.configure(relief="flat", bd=1)
+        # Visual feedback: move the single highlight frame onto the selected swatch
+        self.pal_grid.coords(self.pal_highlight, *self.pal_cell_box(idx))
+        self.pal_grid.itemconfigure(self.pal_highlight, state="normal")
 
     def update_color_from_sliders(self, _=None):
         if self.selected_index is None: return
         r, g, b = int(self.r_val.get()), int(self.g_val.get()), int(self.b_val.get())
         self.palette[self.selected_index] = [r, g, b]
-        hex_code = f"#{r:02x}{g:02x}{b:02x}"
-        self.pal_buttons[self.selected_index].configure(bg=hex_code)
-        self.hex_var.set(hex_code)
-        if hasattr(self, 'update_pal_preview'): self.update_pal_preview()
+        self.paint_pal_grid([self.selected_index])
+        self.hex_var.set(rgb_hex((r, g, b)))
+        if hasattr(self, 'pal_canvas'): self.update_pal_preview(indices=[self.selected_index])
 
     def apply_hex(self):
         if self.selected_index is None: return
@@ -428,22 +596,16 @@ class BZReduxSuite:
         path = filedialog.askopenfilename(filetypes=[("ACT Palette", "*.act")])
         if not path: return
         try:
-            with open(path, 'rb') as f:
-                raw = f.read(768)
-                self.palette = [list(struct.unpack('<3B', raw[i:i+3])) for i in range(0, 768, 3)]
-            for i, btn in enumerate(self.pal_buttons):
-                r, g, b = self.palette[i]
-                btn.configure(bg=f"#{r:02x}{g:02x}{b:02x}")
-            if hasattr(self, 'update_pal_preview'): self.update_pal_preview()
+            self.palette = engine.read_act(path)
+            self.paint_pal_grid()
+            if hasattr(self, 'pal_canvas'): self.update_pal_preview()
         except Exception as e: print(f"Load Error: {e}")
 
     def save_act(self):
         path = filedialog.asksaveasfilename(defaultextension=".act", filetypes=[("ACT Palette", "*.act")])
         if not path: return
         try:
-            with open(path, 'wb') as f:
-                for color in self.palette:
-                    f.write(struct.pack('<3B', *color))
+            engine.write_act(path, self.palette)
         except Exception as e: print(f"Save Error: {e}")
 
     def import_palette_from_image(self):
@@ -465,10 +627,8 @@ class BZReduxSuite:
             while len(pal_data) < 256: pal_data.append([0,0,0])
             
             self.palette = pal_data[:256]
-            for i, btn in enumerate(self.pal_buttons):
-                r, g, b = self.palette[i]
-                btn.configure(bg=f"#{r:02x}{g:02x}{b:02x}")
-            if hasattr(self, 'update_pal_preview'): self.update_pal_preview()
+            self.paint_pal_grid()
+            if hasattr(self, 'pal_canvas'): self.update_pal_preview()
             messagebox.showinfo("Success", "Palette imported from image.")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to import palette: {e}")
@@ -508,6 +668,20 @@ class BZReduxSuite:
         self.map_scale_var = tk.StringVar(value="No Scaling")
         ttk.Combobox(opts, textvariable=self.map_scale_var, values=["No Scaling", "128x128", "256x256", "512x512", "1024x1024"], state="readonly").grid(row=1, column=1, padx=5, sticky="w")
 
+        # Output format for PNG -> MAP
+        ttk.Label(opts, text="MAP Format (PNG to MAP):").grid(row=2, column=0, padx=10, pady=5, sticky="w")
+        self.map_format_var = tk.StringVar(value=self.config.get("map_format", "ARGB8888"))
+        map_fmt_combo = ttk.Combobox(opts, textvariable=self.map_format_var, values=["ARGB8888", "XRGB8888", "RGB565", "ARGB4444", "Auto", "Indexed"], state="readonly")
+        map_fmt_combo.grid(row=2, column=1, padx=5, sticky="w")
+        ToolTip(map_fmt_combo, "Auto: RGB565 for opaque images, ARGB4444 when there is alpha\n(2 bytes per pixel). Indexed: 1 byte per pixel, uses the palette.")
+        self.map_dither = tk.BooleanVar(value=self.config.get("map_dither", False))
+        dither_chk = ttk.Checkbutton(opts, text="Dither", variable=self.map_dither)
+        dither_chk.grid(row=2, column=2, padx=5, sticky="w")
+        ToolTip(dither_chk, "Indexed only: spread the palette error over neighbouring\npixels instead of snapping each pixel to its nearest colour.")
+
+        self.make_incremental_check(opts).grid(row=3, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+        self.make_discovery_frame(opts).grid(row=4, column=0, columnspan=3, padx=10, pady=5, sticky="we")
+
         # 3. Palette Override Section (Restored)
         pal_opt = ttk.Frame(self.tab_map)
         pal_opt.pack(pady=5, padx=20, fill="x")
@@ -525,28 +699,30 @@ class BZReduxSuite:
         ttk.Button(f, text="+ Single File (MAP/PNG)", style="Action.TButton", command=self.ui_single_map).pack(side="left", padx=10, expand=True, fill="x")
         ttk.Button(f, text="+ Batch Folder", style="Action.TButton", command=self.ui_batch_map).pack(side="left", padx=10, expand=True, fill="x")
         
-        self.map_log = tk.Text(self.tab_map, height=15, bg="#050505", fg=BZ_FG, font=("Consolas", 9))
+        self.map_log = self.make_log(self.tab_map, 15)
         self.map_log.pack(padx=20, pady=10, fill="both")
 
-    def update_pal_preview(self, custom_palette=None):
-        """Redraws the color strip. Uses workspace palette unless custom_palette is passed."""
-        self.pal_canvas.delete("all")
+    def update_pal_preview(self, custom_palette=None, indices=None):
+        """
+        Recolours the color strip. Uses workspace palette unless custom_palette
+        is passed; `indices` limits a workspace edit to the swatches it touched.
+        """
+        if not self.pal_strip_items:
+            width = 1100
+            color_w = width / 256
+            self.pal_strip_items = [self.pal_canvas.create_rectangle(i*color_w, 0, (i+1)*color_w, 30, outline="")
+                                    for i in range(256)]
+        if indices is not None and self.pal_strip_custom:
+            return  # An override palette is on show; workspace edits don't touch it
+        self.pal_strip_custom = bool(custom_palette)
         target_pal = custom_palette if custom_palette else self.palette
-        width = 1100 
-        color_w = width / 256
-        for i in range(256):
-            r, g, b = target_pal[i]
-            color_hex = f"#{r:02x}{g:02x}{b:02x}"
-            self.pal_canvas.create_rectangle(i*color_w, 0, (i+1)*color_w, 30, fill=color_hex, outline="")
+        self.recolor_swatches(self.pal_canvas, self.pal_strip_items, self.pal_strip_colors, target_pal, indices)
 
     def ui_load_override_pal(self):
         path = filedialog.askopenfilename(filetypes=[("ACT Palette", "*.act")])
         if path:
             self.custom_pal_path.set(path)
-            with open(path, 'rb') as f:
-                raw = f.read(768)
-                temp_pal = [list(struct.unpack('<3B', raw[i:i+3])) for i in range(0, 768, 3)]
-                self.update_pal_preview(temp_pal)
+            self.update_pal_preview(engine.read_act(path))
 
     def reset_map_palette(self):
         self.custom_pal_path.set("[Built-in Workspace Palette]")
@@ -557,63 +733,19 @@ class BZReduxSuite:
         if folder:
             self.batch_out_path.set(folder)
 
-    def process_map_file(self, path, output_folder=None):
-        base_name = os.path.basename(path)
-        file_no_ext = os.path.splitext(base_name)[0]
-        dest_dir = output_folder if (output_folder and os.path.isdir(output_folder)) else os.path.dirname(path)
-
-        # 1. Determine active palette
-        active_pal = self.palette
-        override_path = self.custom_pal_path.get()
-        if os.path.exists(override_path) and override_path.lower().endswith(".act"):
-            with open(override_path, 'rb') as f:
-                raw = f.read(768)
-                active_pal = [list(struct.unpack('<3B', raw[i:i+3])) for i in range(0, 768, 3)]
-
-        if path.lower().endswith(".map"):
-            with open(path, 'rb') as f:
-                rb, fmt, h, _ = struct.unpack('<4H', f.read(8))
-                w = rb // BZMapFormat.bpp[fmt]
-                data = f.read()
-
-                if fmt == BZMapFormat.INDEXED:
-                    img = Image.frombytes('L', (w, h), data)
-                    flat_pal = [v for c in active_pal for v in c]
-                    img.putpalette(flat_pal)
-                    img = img.convert("RGBA")
-                else:
-                    img = Image.frombytes('RGBA', (w, h), data, 'raw', 'BGRA')
-                
-                # Apply Scaling
-                scale_val = self.map_scale_var.get()
-                if scale_val != "No Scaling":
-                    new_size = int(scale_val.split('x')[0])
-                    img = img.resize((new_size, new_size), Image.Resampling.LANCZOS)
-                
-                img.save(os.path.join(dest_dir, file_no_ext + ".png"))
-                return f"Exported: {file_no_ext}.png"
-        else:
-            # PNG -> MAP
-            img = Image.open(path).convert("RGBA")
-            
-            # Apply Scaling
-            scale_val = self.map_scale_var.get()
-            if scale_val != "No Scaling":
-                new_size = int(scale_val.split('x')[0])
-                img = img.resize((new_size, new_size), Image.Resampling.LANCZOS)
-
-            b, g, r, a = img.split()
-            bgra = Image.merge('RGBA', (b, g, r, a))
-            with open(os.path.join(dest_dir, file_no_ext + ".map"), 'wb') as f:
-                f.write(struct.pack('<4H', img.width * 4, 3, img.height, 0))
-                f.write(bgra.tobytes())
-            return f"Packed: {file_no_ext}.map"
+    def capture_map_options(self):
+        """Snapshot of the MAP tab settings for one job (main thread only)."""
+        return MapOptions(scale=self.map_scale_var.get(),
+                          palette=tuple(tuple(c) for c in self.palette),
+                          palette_path=self.custom_pal_path.get(),
+                          out_format=self.map_format_var.get(),
+                          dither=self.map_dither.get())
 
     def ui_single_map(self):
         path = filedialog.askopenfilename(filetypes=[("MAP or PNG", "*.map;*.png")])
         if not path: return
         try:
-            msg = self.process_map_file(path)
+            msg = engine.process_map_file(path, self.capture_map_options())
             self.log_msg(self.map_log, msg)
         except Exception as e: self.log_msg(self.map_log, f"ERROR: {e}")
 
@@ -623,16 +755,33 @@ class BZReduxSuite:
         
         out_dir = self.batch_out_path.get()
         if out_dir == "[Same as Source]": out_dir = None
+        opts = self.capture_map_options()
+        self.jobs.submit("MAP batch", self.run_batch_map, src_folder, out_dir, opts,
+                         self.incremental.get(), self.capture_discovery(), trace=self.batch_trace.get(),
+                         log=self.threaded_log(self.map_log))
+
+    def run_batch_map(self, job, src_folder, out_dir, opts, incremental, discovery):
+        log = self.threaded_log(self.map_log)
+        paths = self.iter_batch_sources(src_folder, (".map", ".png"), discovery, out_dir)
+        # Sub-folders of the source are recreated under the output folder
+        outputs_for = lambda p: engine.map_outputs(p, opts, engine.mirror_dir(p, src_folder, out_dir))
+        cache, fingerprint, paths, opts = self.open_build_cache(incremental, "map", paths, opts, outputs_for)
+        paths = self.counted(job, paths)
         
         count = 0
-        for file in os.listdir(src_folder):
-            if file.lower().endswith((".map", ".png")):
-                try:
-                    self.process_map_file(os.path.join(src_folder, file), out_dir)
+        built = []
+        with self.open_trace(job, log) as tracer:
+            for res in engine.iter_batch(engine.process_map_file, paths, opts, control=job.control, trace=job.trace,
+                                         job_args=lambda p: (engine.mirror_dir(p, src_folder, out_dir),)):
+                job.meter.add(res.path)
+                if tracer: tracer.add(res.path, res.stages)
+                if res.error is None:
                     count += 1
-                except Exception as e:
-                    self.log_msg(self.map_log, f"Skip {file}: {e}")
-        self.log_msg(self.map_log, f"BATCH COMPLETE: {count} files processed.")
+                    built.append(res.path)
+                else:
+                    log(f"Skip {os.path.basename(res.path)}: {res.error}")
+            self.close_build_cache(cache, "map", fingerprint, built, outputs_for, log)
+        log(self.batch_summary(job, f"{count} files processed."))
 
 # --- LGT CONVERTER (STITCHING FIXED) ---
     def setup_lgt_tab(self):
@@ -646,30 +795,37 @@ class BZReduxSuite:
         self.lgt_width_var = tk.StringVar(value="0") # 0 = Auto-Square
         ttk.Entry(ctrl, textvariable=self.lgt_width_var, width=10).grid(row=0, column=1, padx=5)
         ttk.Label(ctrl, text="(Leave 0 for square maps)").grid(row=0, column=2, padx=5)
+        ttk.Button(ctrl, text="Read .TRN", command=self.parse_trn_dimensions).grid(row=0, column=3, padx=5)
+        self.make_discovery_frame(ctrl).grid(row=1, column=0, columnspan=4, padx=5, pady=5, sticky="we")
+        ttk.Label(ctrl, text="Worker Processes:").grid(row=2, column=0, padx=5)
+        workers_combo = ttk.Combobox(ctrl, textvariable=self.lgt_workers, values=[str(n) for n in range(1, engine.default_workers() + 1)], state="readonly", width=5)
+        workers_combo.grid(row=2, column=1, padx=5, sticky="w")
+        ToolTip(workers_combo, "Lightmaps converted in parallel by the batch buttons.\nUse 1 to process one map at a time.")
 
         btn_f = ttk.Frame(self.tab_lgt)
         btn_f.pack(pady=10)
         ttk.Button(btn_f, text="+ LGT to PNG (Extract)", style="Action.TButton", command=self.lgt_to_png).pack(side="left", padx=10)
         ttk.Button(btn_f, text="+ PNG to LGT (Pack)", style="Action.TButton", command=self.png_to_lgt).pack(side="left", padx=10)
 
-        self.lgt_log = tk.Text(self.tab_lgt, height=20, bg="#050505", fg=BZ_FG, font=("Consolas", 9))
+        # Batch: every lightmap in a mission folder, sized from its .TRN
+        batch_btn_f = ttk.Frame(self.tab_lgt)
+        batch_btn_f.pack(pady=5)
+        ttk.Button(batch_btn_f, text="+ Batch Folder: LGT to PNG", style="Action.TButton", command=lambda: self.ui_batch_lgt(True)).pack(side="left", padx=10)
+        ttk.Button(batch_btn_f, text="+ Batch Folder: PNG to LGT", style="Action.TButton", command=lambda: self.ui_batch_lgt(False)).pack(side="left", padx=10)
+        self.terrain_index = engine.TerrainIndex()
+
+        self.lgt_log = self.make_log(self.tab_lgt, 20)
         self.lgt_log.pack(padx=20, pady=10, fill="both")
 
     def parse_trn_dimensions(self):
         path = filedialog.askopenfilename(filetypes=[("Terrain File", "*.trn")])
         if not path: return
         try:
-            with open(path, 'r') as f:
-                content = f.read()
-                # Find Width=XXXX in the [Size] section
-                import re
-                width_match = re.search(r'Width\s*=\s*(\d+)', content)
-                if width_match:
-                    world_width = int(width_match.group(1))
-                    # Redux zones are 1280 units wide
-                    zones_wide = world_width // 1280
-                    self.lgt_width_var.set(str(zones_wide))
-                    self.log_msg(self.lgt_log, f"TRN Parsed: World Width {world_width} = {zones_wide} Zones Wide.")
+            dims = engine.trn_dimensions(path)
+            if dims:
+                world_width, zones_wide = dims
+                self.lgt_width_var.set(str(zones_wide))
+                self.log_msg(self.lgt_log, f"TRN Parsed: World Width {world_width} = {zones_wide} Zones Wide.")
         except Exception as e:
             self.log_msg(self.lgt_log, f"TRN Error: {e}")
 
@@ -677,73 +833,59 @@ class BZReduxSuite:
         path = filedialog.askopenfilename(filetypes=[("Lightmap", "*.lgt")])
         if not path: return
         try:
-            file_size = os.path.getsize(path)
-            # ZONE_RES is 256 for Redux. Chunks are 128x128 in legacy.
-            total_chunks = file_size // (ZONE_RES * ZONE_RES)
-            map_chunks = total_chunks - 1 
-            
-            if map_chunks <= 0:
-                raise Exception("File too small to contain map data.")
-
-            gw = int(self.lgt_width_var.get())
-            if gw <= 0: gw = int(math.sqrt(map_chunks))
-            gh = map_chunks // gw
-            
-            with open(path, 'rb') as f:
-                # 1. Skip the Border Chunk (first 65,536 bytes for Redux)
-                f.read(ZONE_RES * ZONE_RES)
-                
-                full_img = Image.new('L', (gw * ZONE_RES, gh * ZONE_RES))
-                
-                # 2. Stitch Chunks: Sequential reading placed Top-to-Bottom
-                # This fixes the vertical swap by starting the file data at the top row.
-                for yseg in range(gh): 
-                    for xseg in range(gw):
-                        data = f.read(ZONE_RES * ZONE_RES)
-                        if not data: break
-                        
-                        zone_img = Image.frombytes('L', (ZONE_RES, ZONE_RES), data)
-                        
-                        pos_x = xseg * ZONE_RES
-                        pos_y = yseg * ZONE_RES
-                        full_img.paste(zone_img, (pos_x, pos_y))
-                
-                # 3. Flip North/South (Fix Vertical Orientation)
-                full_img = full_img.transpose(Image.FLIP_TOP_BOTTOM)
-
-                out = os.path.splitext(path)[0] + ".png"
-                full_img.save(out)
-                self.log_msg(self.lgt_log, f"Exported {gw}x{gh} map. Top-Down segment order applied.")
-                
+            opts = LGTOptions(width=int(self.lgt_width_var.get()))
+            self.log_msg(self.lgt_log, engine.lgt_to_png(path, opts))
         except Exception as e: self.log_msg(self.lgt_log, f"ERROR: {e}")
 
     def png_to_lgt(self):
         path = filedialog.askopenfilename(filetypes=[("PNG", "*.png")])
         if not path: return
         try:
-            img = Image.open(path).convert('L')
-            # Flip North/South to match internal storage format
-            img = img.transpose(Image.FLIP_TOP_BOTTOM)
-            
-            gw, gh = img.width // ZONE_RES, img.height // ZONE_RES
-            
-            out = os.path.splitext(path)[0] + ".lgt"
-            with open(out, 'wb') as f:
-                # 1. Write Border Chunk
-                border_color = img.getpixel((0, 0)) # Sample top-left for border color
-                f.write(bytes([border_color] * (ZONE_RES * ZONE_RES)))
-                
-                # 2. Pack Chunks (Top-Down order)
-                for yseg in range(gh):
-                    for xseg in range(gw):
-                        box = (xseg * ZONE_RES, yseg * ZONE_RES, 
-                               (xseg + 1) * ZONE_RES, (yseg + 1) * ZONE_RES)
-                        zone = img.crop(box)
-                        f.write(zone.tobytes())
-                        
-            self.log_msg(self.lgt_log, f"Packed {gw*gh} zones into .LGT (Top-Down).")
+            self.log_msg(self.lgt_log, engine.png_to_lgt(path))
         except Exception as e: self.log_msg(self.lgt_log, f"ERROR: {e}")
 
+    def ui_batch_lgt(self, extract):
+        """Converts every lightmap under a mission folder, taking each map's grid from its .TRN."""
+        folder = filedialog.askdirectory(title="Select Mission Folder")
+        if not folder: return
+        recursive, include, exclude = self.capture_discovery()
+        try: workers = max(1, int(self.lgt_workers.get()))
+        except ValueError: workers = 1
+        index = self.terrain_index
+        log = self.threaded_log(self.lgt_log)
+
+        def run_batch(job):
+            index.scan(folder, include, exclude, recursive)
+            func = engine.lgt_to_png if extract else engine.png_to_lgt
+            opts_for = {}
+            for p in (index.lightmaps if extract else index.images):
+                try: opts_for[p] = index.options_for(p)
+                except Exception as e:
+                    log(f"Skip {os.path.basename(p)}: {e}")
+                    continue
+                if index.terrain_for(p) is None:
+                    log(f"{os.path.basename(p)}: no .TRN found, assuming a square map.")
+            if not opts_for:
+                log("No lightmaps found.")
+                return
+            count = 0
+            job.total = len(opts_for)
+            with self.open_trace(job, log) as tracer:
+                for res in engine.iter_batch(func, list(opts_for), workers=workers, job_args=lambda p: (opts_for[p],),
+                                             control=job.control, trace=job.trace):
+                    job.meter.add(res.path)
+                    if tracer: tracer.add(res.path, res.stages)
+                    for note in res.notes:
+                        log(note)
+                    if res.error is None:
+                        count += 1
+                        log(f"{os.path.basename(res.path)}: {res.msg}")
+                    else:
+                        log(f"Skip {os.path.basename(res.path)}: {res.error}")
+            log(self.batch_summary(job, f"{count} lightmaps processed."))
+
+        self.jobs.submit("LGT batch", run_batch, trace=self.batch_trace.get(), log=log)
+
     def setup_texture_tab(self):
         ttk.Label(self.tab_tex, text="Advanced Texture Processor", font=(self.custom_font_name, 16, "bold"), foreground=BZ_GREEN).pack(pady=10)
         
@@ -796,6 +938,18 @@ class BZReduxSuite:
         self.tex_overwrite = tk.BooleanVar(value=self.config.get("tex_overwrite", False)) 
         ttk.Checkbutton(fmt_f, text="Overwrite Existing", variable=self.tex_overwrite).grid(row=4, column=0, columnspan=2, padx=5, pady=5, sticky="w")
 
+        # DDS encoder: texconv.exe when present (Windows), otherwise the built-in BC1/BC3 encoder
+        ttk.Label(fmt_f, text="DDS Encoder:").grid(row=5, column=0, padx=5, sticky="w")
+        self.tex_encoder = tk.StringVar(value=self.config.get("tex_encoder", "Auto"))
+        self.tex_encoder_combo = ttk.Combobox(fmt_f, textvariable=self.tex_encoder, values=["Auto", "Built-in"], state="readonly", width=10)
+        self.tex_encoder_combo.grid(row=5, column=1, padx=5, pady=2)
+        ToolTip(self.tex_encoder_combo, "Auto: texconv.exe if found, else built-in.\nBuilt-in: always use the in-process DXT encoder.")
+
+        self.tex_mip_coverage = tk.BooleanVar(value=self.config.get("tex_mip_coverage", False))
+        self.tex_mip_coverage_chk = ttk.Checkbutton(fmt_f, text="Keep Alpha Coverage (Cutouts)", variable=self.tex_mip_coverage)
+        self.tex_mip_coverage_chk.grid(row=6, column=0, columnspan=2, padx=5, pady=2, sticky="w")
+        ToolTip(self.tex_mip_coverage_chk, "Rescale mipmap alpha so alpha-tested foliage,\nfences and decals don't thin out with distance.")
+
         # --- Advanced Map Generation Section ---
         gen_f = ttk.LabelFrame(left_col, text=" Map Generation ", padding=10)
         gen_f.pack(pady=5, padx=5, fill="x")
@@ -832,12 +986,16 @@ class BZReduxSuite:
         # Preview Canvas
         self.tex_preview_canvas = tk.Canvas(right_col, bg="#050505", height=200, highlightthickness=0)
         self.tex_preview_canvas.pack(fill="x", padx=5, pady=5)
+        # Header facts for the previewed file (size, format, mips, alpha)
+        self.tex_info_var = tk.StringVar()
+        ttk.Label(right_col, textvariable=self.tex_info_var).pack(anchor="w", padx=5)
         
-        self.tex_log = tk.Text(right_col, height=15, bg="#050505", fg=BZ_FG, font=("Consolas", 9))
+        self.tex_log = self.make_log(right_col, 15)
         self.tex_log.pack(fill="both", expand=True, padx=5, pady=5)
 
         self.tex_progress = ttk.Progressbar(right_col, style="BZ.Horizontal.TProgressbar", mode="determinate")
         self.tex_progress.pack(fill="x", padx=5, pady=5)
+        self.log_channels[self.tex_log].progress = self.tex_progress
         # Style for progress bar needs to be defined if not already
         style = ttk.Style()
         style.configure("BZ.Horizontal.TProgressbar", thickness=15, background=BZ_GREEN, troughcolor="#050505")
@@ -857,6 +1015,27 @@ class BZReduxSuite:
         ttk.Entry(batch_f, textvariable=self.tex_batch_out).pack(fill="x", padx=10, pady=2)
         ttk.Button(batch_f, text="Set Output Folder", command=self.set_tex_batch_out).pack(pady=2, fill="x")
 
+        # Worker processes: 1 keeps the old single-threaded behaviour
+        work_f = ttk.Frame(batch_f)
+        work_f.pack(fill="x", pady=2)
+        ttk.Label(work_f, text="Worker Processes:").pack(side="left", padx=(10, 5))
+        workers_combo = ttk.Combobox(work_f, textvariable=self.tex_workers, values=[str(n) for n in range(1, engine.default_workers() + 1)], state="readonly", width=5)
+        workers_combo.pack(side="left")
+        ToolTip(workers_combo, "Files converted in parallel.\nUse 1 to process one file at a time.")
+
+        mem_f = ttk.Frame(batch_f)
+        mem_f.pack(fill="x", pady=2)
+        ttk.Label(mem_f, text="Memory Limit (MB):").pack(side="left", padx=(10, 5))
+        mem_combo = ttk.Combobox(mem_f, textvariable=self.tex_memory_limit, values=["512", "1024", "2048", "4096", "8192", "0"], width=7)
+        mem_combo.pack(side="left")
+        ToolTip(mem_combo, "Estimated working memory allowed per file (and per worker).\nFiles whose estimate is larger are skipped instead of\nrunning out of memory. 0 = no limit.")
+
+        group_chk = ttk.Checkbutton(batch_f, text="Group texconv Calls", variable=self.tex_batch_texconv)
+        group_chk.pack(anchor="w", padx=10, pady=2)
+        ToolTip(group_chk, "Queue every DDS of a batch and run texconv once per\nformat instead of once per file (texconv only).")
+        self.make_incremental_check(batch_f).pack(anchor="w", padx=10, pady=2)
+        self.make_discovery_frame(batch_f).pack(fill="x", padx=10, pady=2)
+
     def browse_single_tex(self):
         path = filedialog.askopenfilename(filetypes=[("Image", "*.png;*.tga;*.jpg;*.bmp;*.dds")])
         if path:
@@ -868,26 +1047,67 @@ class BZReduxSuite:
         self.tex_single_path.set(path)
         self.load_tex_preview(path)
 
-    def load_tex_preview(self, path):
+    def describe_file(self, path):
+        """One-line header summary for the preview, e.g. '2048x2048 DXT5, 12 mips, alpha'."""
         try:
-            img = Image.open(path)
-            # Resize for preview
-            img.thumbnail((300, 200))
-            self.tk_tex_preview = ImageTk.PhotoImage(img)
-            self.tex_preview_canvas.delete("all")
-            cw = self.tex_preview_canvas.winfo_width()
-            ch = self.tex_preview_canvas.winfo_height()
-            self.tex_preview_canvas.create_image(cw//2, ch//2, image=self.tk_tex_preview)
-        except Exception as e:
-            self.log_msg(self.tex_log, f"Preview Error: {e}")
+            info = engine.probe(path)
+        except Exception:
+            return ""
+        size = f"{info.width}x{info.height} " if info.width else ""
+        mips = f", {info.mips} mips" if info.mips > 1 else ""
+        return f"{size}{info.pixel_format}{mips}{', alpha' if info.alpha else ''}"
+
+    def load_tex_preview(self, path):
+        self.tex_info_var.set(self.describe_file(path))
+        img = self.thumb_cache.peek(path)
+        if img is not None:
+            self.show_tex_preview(path, img, None)
+            return
+        self.tex_preview_canvas.delete("all")
+        # Only the latest selection is decoded; older pending ones are dropped
+        with self.preview_lock:
+            self.preview_pending = path
+            if self.preview_busy:
+                return
+            self.preview_busy = True
+        threading.Thread(target=self.preview_worker, daemon=True).start()
+
+    def preview_worker(self):
+        while True:
+            with self.preview_lock:
+                path, self.preview_pending = self.preview_pending, None
+                if path is None:
+                    self.preview_busy = False
+                    return
+            try:
+                img, err = self.thumb_cache.get(path), None
+            except Exception as e:
+                img, err = None, e
+            self.root.after(0, self.show_tex_preview, path, img, err)
+
+    def show_tex_preview(self, path, img, err):
+        if path != self.tex_single_path.get():
+            return  # selection moved on while this one was decoding
+        if err is not None:
+            self.log_msg(self.tex_log, f"Preview Error: {err}")
+            return
+        self.tk_tex_preview = ImageTk.PhotoImage(img)
+        self.tex_preview_canvas.delete("all")
+        cw = self.tex_preview_canvas.winfo_width()
+        ch = self.tex_preview_canvas.winfo_height()
+        self.tex_preview_canvas.create_image(cw//2, ch//2, image=self.tk_tex_preview)
 
     def update_tex_ui_state(self, *args):
         if self.tex_to_ext.get() == ".dds":
             self.tex_compress_combo.configure(state="readonly")
             self.tex_mips_chk.configure(state="normal")
+            self.tex_encoder_combo.configure(state="readonly")
+            self.tex_mip_coverage_chk.configure(state="normal")
         else:
             self.tex_compress_combo.configure(state="disabled")
             self.tex_mips_chk.configure(state="disabled")
+            self.tex_encoder_combo.configure(state="disabled")
+            self.tex_mip_coverage_chk.configure(state="disabled")
 
     # --- TEXTURE LOGIC FUNCTIONS ---
     def set_tex_batch_out(self):
@@ -895,194 +1115,196 @@ class BZReduxSuite:
         if folder: 
             self.tex_batch_out.set(folder)
 
+    def capture_texture_options(self):
+        """Snapshot of the texture tab settings for one job (main thread only)."""
+        return TextureOptions(
+            to_ext=self.tex_to_ext.get(),
+            scale_cutoff=self.tex_scale_cutoff.get(),
+            auto_alpha=self.tex_auto_alpha.get(),
+            overwrite=self.tex_overwrite.get(),
+            gen_emissive=self.gen_emissive.get(),
+            emissive_thresh=self.emissive_thresh.get(),
+            gen_specular=self.gen_specular.get(),
+            spec_contrast=self.spec_contrast.get(),
+            gen_normal=self.gen_normal.get(),
+            norm_strength=self.norm_strength.get(),
+            norm_flip_y=self.norm_flip_y.get(),
+            memory_limit_mb=self.capture_memory_limit(),
+            encode=EncodeOptions(compress=self.tex_compress.get(), mips=self.tex_mips.get(),
+                                 mip_alpha_coverage=self.tex_mip_coverage.get(), encoder=self.tex_encoder.get(), batch_texconv=self.tex_batch_texconv.get()))
+
+    def capture_memory_limit(self):
+        try: return max(0, int(self.tex_memory_limit.get()))
+        except ValueError: return TextureOptions.memory_limit_mb
+
+    def threaded_log(self, textbox):
+        """Returns a log callback that is safe to call from a worker thread."""
+        return self.log_channels[textbox].write
+
+    def make_incremental_check(self, parent):
+        chk = ttk.Checkbutton(parent, text="Skip Unchanged (Build Cache)", variable=self.incremental)
+        ToolTip(chk, "Only rebuild files whose source or settings changed\nsince the last batch. Changed files are always rebuilt.")
+        return chk
+
+    def make_discovery_frame(self, parent):
+        """Sub-folder, include/exclude glob and timing trace settings, shared by every batch tab."""
+        f = ttk.Frame(parent)
+        sub_chk = ttk.Checkbutton(f, text="Include Sub-folders", variable=self.batch_recursive)
+        sub_chk.grid(row=0, column=0, columnspan=2, sticky="w")
+        ToolTip(sub_chk, "Scan the whole folder tree. Outputs keep the same\nsub-folder layout under the output folder.")
+        ttk.Label(f, text="Include:").grid(row=1, column=0, sticky="w")
+        inc = ttk.Entry(f, textvariable=self.batch_include, width=24)
+        inc.grid(row=1, column=1, sticky="we", padx=5, pady=1)
+        ToolTip(inc, "Only files matching these patterns, e.g. *_d.png; vehicles/*\nEmpty = every supported file.")
+        ttk.Label(f, text="Exclude:").grid(row=2, column=0, sticky="w")
+        exc = ttk.Entry(f, textvariable=self.batch_exclude, width=24)
+        exc.grid(row=2, column=1, sticky="we", padx=5, pady=1)
+        ToolTip(exc, "Skip files or folders matching these patterns, e.g. *_n.*; backup")
+        trace_chk = ttk.Checkbutton(f, text="Write Timing Trace", variable=self.batch_trace)
+        trace_chk.grid(row=3, column=0, columnspan=2, sticky="w")
+        ToolTip(trace_chk, f"Time every stage of every file (decode, rescale, save, texconv...)\ninto {TRACE_FILE} and log the slowest stages and files at the end.")
+        f.columnconfigure(1, weight=1)
+        return f
+
+    def capture_discovery(self):
+        """(recursive, include, exclude) for one batch (main thread only)."""
+        return (self.batch_recursive.get(), engine.split_patterns(self.batch_include.get()),
+                engine.split_patterns(self.batch_exclude.get()))
+
+    def iter_batch_sources(self, src_folder, extensions, discovery, out_dir=None):
+        recursive, include, exclude = discovery
+        return engine.iter_sources(src_folder, extensions, include, exclude, recursive, skip=(out_dir,))
+
+    def counted(self, job, paths):
+        """
+        Runs the lazy scan (and build cache filter) ahead of the workers on a
+        producer thread, so job.total counts files found, not files handed out.
+        """
+        job.scan = engine.ScanAhead(paths)
+        return job.scan
+
+    @contextmanager
+    def open_trace(self, job, log):
+        """
+        The job's TraceLog, or None with tracing off. The file is closed however
+        the batch ends; the summary is logged only if something was traced.
+        """
+        tracer = engine.TraceLog(TRACE_FILE, job.name) if job.trace else None
+        try:
+            yield tracer
+        finally:
+            if tracer is not None:
+                tracer.close()
+                if tracer.stages:
+                    for line in tracer.summary():
+                        log(line)
+                    log(f"Timing trace appended to {TRACE_FILE}.")
+
+    def batch_summary(self, job, what):
+        head = "BATCH CANCELLED" if job.control.cancelled else "BATCH COMPLETE"
+        return f"{head}: {what} ({job.status()})"
+
+    def open_build_cache(self, enabled, kind, paths, opts, outputs_for):
+        """
+        With incremental builds enabled, returns (cache, fingerprint,
+        stale_paths, opts) where stale_paths lazily drops up-to-date files.
+        Stale files are rebuilt even if their outputs exist. Otherwise returns
+        (None, None, paths, opts).
+        """
+        if not enabled:
+            return None, None, paths, opts
+        cache = engine.BuildCache(BUILD_CACHE_FILE)
+        fingerprint = engine.options_fingerprint(kind, opts)
+        stale = cache.iter_stale(kind, paths, fingerprint, outputs_for)
+        return cache, fingerprint, stale, replace(opts, overwrite=True)
+
+    def drop_failed_outputs(self, built, failed, outputs_for, log):
+        """Takes sources whose deferred texconv output never appeared back out of `built`; returns how many."""
+        if not failed: return 0
+        failed = {os.path.normcase(os.path.abspath(o)) for o in failed}
+        dropped = 0
+        for p in list(built):
+            missing = [o for o in outputs_for(p) if os.path.normcase(os.path.abspath(o)) in failed]
+            if missing:
+                built.remove(p)
+                dropped += 1
+                log(f"Skip {os.path.basename(p)}: texconv produced no {os.path.basename(missing[0])}")
+        return dropped
+
+    def close_build_cache(self, cache, kind, fingerprint, built, outputs_for, log):
+        if cache is None: return
+        for p in built:
+            cache.record(kind, p, fingerprint, outputs_for(p))
+        cache.save()
+        if cache.skipped:
+            log(f"Up to date: {cache.skipped} files skipped (build cache).")
+
     def start_batch_thread(self):
         src_folder = filedialog.askdirectory(title="Select Source Folder")
         if not src_folder: return
-        self.tex_progress['value'] = 0
-        thread = threading.Thread(target=self.ui_batch_tex, args=(src_folder,), daemon=True)
-        thread.start()
-
-    def ui_batch_tex(self, src_folder):
-        """Thread-safe batch processing with progress updates"""
+        self.log_channels[self.tex_log].set_progress(0)
+        # Read every Tk variable here, on the main thread; the worker only sees plain values
         out_dir = self.tex_batch_out.get()
         if out_dir == "[Same as Source]": 
             out_dir = None
-        
         from_filter = self.tex_from_ext.get().lower()
-        
-        # Identify valid files
+        opts = self.capture_texture_options()
+        try: workers = max(1, int(self.tex_workers.get()))
+        except ValueError: workers = 1
+        incremental = self.incremental.get()
+        discovery = self.capture_discovery()
+        self.jobs.submit("Texture batch", self.ui_batch_tex, src_folder, opts, out_dir, from_filter, workers, incremental, discovery,
+                         trace=self.batch_trace.get(), log=self.threaded_log(self.tex_log))
+
+    def ui_batch_tex(self, job, src_folder, opts, out_dir, from_filter, workers=1, incremental=False, discovery=(False, (), ())):
+        """Thread-safe batch processing with progress updates"""
+        # Files are found while earlier ones convert; the total is final once the scan is done
         supported = [".png", ".tga", ".dds", ".jpg", ".bmp"]
-        files = [f for f in os.listdir(src_folder) if os.path.splitext(f)[1].lower() in supported]
-        
         if from_filter != "all supported":
-            files = [f for f in files if os.path.splitext(f)[1].lower() == from_filter]
-        
-        total = len(files)
-        if total == 0:
-            self.root.after(0, lambda: self.log_msg(self.tex_log, "No matching files found."))
-            return
-
-        count = 0
-        for file in files:
-            try:
-                msg = self.process_texture(os.path.join(src_folder, file), out_dir)
-                count += 1
-                # Schedule UI updates on the main thread
-                progress = (count / total) * 100
-                self.root.after(0, lambda m=msg, p=progress: (self.log_msg(self.tex_log, m), self.tex_progress.configure(value=p)))
-            except Exception as e:
-                self.root.after(0, lambda f=file, err=e: self.log_msg(self.tex_log, f"Skip {f}: {err}"))
-                    
-        self.root.after(0, lambda c=count: self.log_msg(self.tex_log, f"BATCH COMPLETE: {c} textures processed."))
-
-    def process_texture(self, path, output_folder=None):
-        base_name = os.path.basename(path)
-        file_no_ext = os.path.splitext(base_name)[0]
-        dest_dir = output_folder if (output_folder and os.path.isdir(output_folder)) else os.path.dirname(path)
-        
-        target_ext = self.tex_to_ext.get()
-        out_path = os.path.join(dest_dir, file_no_ext + target_ext)
-        
-        # CHECK FOR OVERWRITE
-        if os.path.exists(out_path) and not self.tex_overwrite.get():
-            return f"Skipped: {file_no_ext}{target_ext} already exists."
-
-        img = Image.open(path).convert("RGBA")
-        w, h = img.size
-
-# --- RESTORED: Power of 2 Rescaling Logic ---
-        cutoff_val = self.tex_scale_cutoff.get()
-        if cutoff_val != "Disabled":
-            try:
-                limit = int(cutoff_val)
-                # If either dimension exceeds the budget, downscale by half
-                if w > limit or h > limit:
-                    new_w, new_h = w // 2, h // 2
-                    img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-                    w, h = img.size # Update dimensions for logging
-            except ValueError:
-                pass
-
-        # Alpha detection
-        has_alpha = False
-        if self.tex_auto_alpha.get():
-            alpha_extrema = img.getchannel('A').getextrema()
-            if alpha_extrema and alpha_extrema[0] < 255:
-                has_alpha = True
-        
-        # Smart naming: if input ends in _d, strip it so we get _e/_s/_n instead of _d_e
-        gen_name = file_no_ext
-        if gen_name.lower().endswith("_d"):
-            gen_name = gen_name[:-2]
-
-        if self.gen_emissive.get(): self.internal_gen_emissive(img, dest_dir, gen_name, target_ext)
-        if self.gen_specular.get(): self.internal_gen_specular(img, dest_dir, gen_name, target_ext)
-        if self.gen_normal.get(): self.internal_gen_normal(img, dest_dir, gen_name, target_ext)
-        
-        self.internal_save_img(img, out_path, has_alpha)
-        return f"Done: {file_no_ext} ({w}x{h}) -> {target_ext}"  
-        
-    # --- INTERNAL UTILITIES ---
-    def internal_save_img(self, img, out_path, has_alpha):
-        if out_path.lower().endswith(".dds"):
-            # 1. Save a temp TGA (Lossless, handles alpha well)
-            temp_tga = out_path.replace(".dds", "_temp.tga")
-            img.save(temp_tga)
-            
-            # 2. Determine compression format
-            # BC1 = DXT1 (No alpha), BC3 = DXT5 (Smooth alpha)
-            comp_mode = self.tex_compress.get()
-            if comp_mode == "Auto":
-                fmt = "BC3_UNORM" if has_alpha else "BC1_UNORM"
-            elif comp_mode == "DXT1":
-                fmt = "BC1_UNORM"
-            elif comp_mode == "DXT5":
-                fmt = "BC3_UNORM"
-            else: # None
-                fmt = "B8G8R8A8_UNORM"
-            
-            # 3. Setup texconv command
-            # -m 0: Generate full mipmap chain
-            # -y: Overwrite existing
-            # -f: Pixel format
-            texconv_bin = resource_path("texconv.exe")
-            
-            if os.name == 'nt' and os.path.exists(texconv_bin):
-                cmd = [
-                    texconv_bin,
-                    "-f", fmt,
-                    "-y",
-                    "-o", os.path.dirname(out_path),
-                    temp_tga
-                ]
-                
-                # Handle mipmap setting from your UI
-                if self.tex_mips.get():
-                    cmd.extend(["-m", "0"]) # Full chain
-                else:
-                    cmd.extend(["-m", "1"]) # Single level
-                    
-                try:
-                    # Hide the console window when running the subprocess
-                    startupinfo = None
-                    if os.name == 'nt':
-                        startupinfo = subprocess.STARTUPINFO()
-                        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    
-                    subprocess.run(cmd, check=True, startupinfo=startupinfo, capture_output=True)
-                    
-                    # texconv creates [filename].dds. If we saved temp as [name]_temp.tga, 
-                    # it creates [name]_temp.dds. Rename it to the final out_path.
-                    generated_dds = temp_tga.replace(".tga", ".dds")
-                    if os.path.exists(generated_dds):
-                        if os.path.exists(out_path): os.remove(out_path)
-                        os.rename(generated_dds, out_path)
-                        
-                finally:
-                    if os.path.exists(temp_tga): os.remove(temp_tga)
-            else:
-                # Fallback for Linux/MacOS or missing texconv
-                # imageio doesn't support BC1/BC3 compression directly as easily as texconv,
-                # but it can save basic DDS files.
-                try:
-                    import imageio.v3 as iio
-                    # Note: complex compression options are limited in imageio/freeimage for DDS
-                    iio.imwrite(out_path, img) 
-                    if os.path.exists(temp_tga): os.remove(temp_tga)
-                except Exception as e:
-                    self.log_msg(self.tex_log, f"DDS Fallback Error: {e}")
-                    if os.path.exists(temp_tga): os.remove(temp_tga)
-                
-        else:
-            # Standard save for non-DDS files
-            img.save(out_path)
-
-    def internal_gen_emissive(self, img, dest, name, ext):
-        thresh = self.emissive_thresh.get()
-        mask = img.convert("L").point(lambda p: 255 if p > thresh else 0)
-        emissive = Image.new("RGBA", img.size, (0, 0, 0, 255))
-        emissive.paste(img, (0, 0), mask)
-        self.internal_save_img(emissive, os.path.join(dest, f"{name}_e{ext}"), False)
-
-    def internal_gen_specular(self, img, dest, name, ext):
-        spec = img.convert("L")
-        contrast = self.spec_contrast.get()
-        spec = spec.point(lambda p: min(255, int(p * contrast)))
-        self.internal_save_img(spec.convert("RGBA"), os.path.join(dest, f"{name}_s{ext}"), False)
-
-    def internal_gen_normal(self, img, dest, name, ext):
-        gray = np.array(img.convert("L"), dtype=float)
-        grad_x = np.gradient(gray, axis=1)
-        grad_y = np.gradient(gray, axis=0)
-        strength = self.norm_strength.get()
-        nx = -grad_x * strength
-        ny = grad_y * strength if self.norm_flip_y.get() else -grad_y * strength
-        nz = np.ones_like(gray) * 255.0
-        norm = np.sqrt(nx**2 + ny**2 + nz**2)
-        nx, ny, nz = nx/norm, ny/norm, nz/norm
-        r, g, b = ((nx + 1.0) * 127.5).astype(np.uint8), ((ny + 1.0) * 127.5).astype(np.uint8), (nz * 255.0).astype(np.uint8)
-        normal_map = Image.fromarray(np.stack([r, g, b, np.full_like(r, 255)], axis=2))
-        self.internal_save_img(normal_map, os.path.join(dest, f"{name}_n{ext}"), False)
+            supported = [from_filter]
+        channel = self.log_channels[self.tex_log]
+        log = channel.write
+        out_for = lambda p: engine.mirror_dir(p, src_folder, out_dir)
+        outputs_for = lambda p: engine.texture_outputs(p, opts, out_for(p))
+        paths = self.iter_batch_sources(src_folder, supported, discovery, out_dir)
+        cache, fingerprint, paths, opts = self.open_build_cache(incremental, "texture", paths, opts, outputs_for)
+        paths = self.counted(job, paths)
+        built = []
+        count = done = 0
+        with self.open_trace(job, log) as tracer:
+            failed = []
+            # Grouped texconv runs happen here at the end, outside any one file's trace
+            with engine.traced(job.trace) as flush_stages, engine.texconv_batch(opts.encode, log, failed) as encode:
+                batch_opts = replace(opts, encode=encode)
+                # Results arrive in completion order, so the progress bar tracks finished files
+                for res in engine.iter_batch(engine.process_texture, paths, batch_opts, workers=workers,
+                                             job_args=lambda p: (out_for(p),), control=job.control, trace=job.trace):
+                    done += 1
+                    job.meter.add(res.path)
+                    if tracer: tracer.add(res.path, res.stages)
+                    progress = (done / max(1, job.total)) * 100
+                    name = os.path.basename(res.path)
+                    for note in res.notes:
+                        log(note)
+                    if res.error is None:
+                        count += 1
+                        built.append(res.path)
+                        log(res.msg)
+                    else:
+                        log(f"Skip {name}: {res.error}")
+                    # Queued, not scheduled: the UI picks both up on its next drain tick
+                    channel.set_progress(progress)
+
+            count -= self.drop_failed_outputs(built, failed, outputs_for, log)
+            # Recorded after texconv_batch has flushed, so deferred DDS outputs exist
+            self.close_build_cache(cache, "texture", fingerprint, built, outputs_for, log)
+            if job.total == 0 and not (cache and cache.skipped):
+                log("No matching files found.")
+                return
+            if not job.control.cancelled:
+                channel.set_progress(100)
+            if tracer: tracer.add("(texconv batch)", flush_stages)
+        log(self.batch_summary(job, f"{count} textures processed."))
 
     def ui_single_tex(self):
         path = self.tex_single_path.get()
@@ -1091,7 +1313,8 @@ class BZReduxSuite:
             if not path: return
             self.tex_single_path.set(path)
         try:
-            msg = self.process_texture(path)
+            msg = engine.process_texture(path, self.capture_texture_options(),
+                                         log=lambda m: self.log_msg(self.tex_log, m))
             self.log_msg(self.tex_log, msg)
         except Exception as e: 
             self.log_msg(self.tex_log, f"ERROR: {e}")
@@ -1122,6 +1345,8 @@ class BZReduxSuite:
         
         self.dxt_overwrite = tk.BooleanVar(value=False)
         ttk.Checkbutton(ctrl, text="Overwrite Existing", variable=self.dxt_overwrite).grid(row=2, column=1, padx=20, pady=5)
+        self.make_incremental_check(ctrl).grid(row=3, column=0, columnspan=2, padx=20, pady=5, sticky="w")
+        self.make_discovery_frame(ctrl).grid(row=4, column=0, columnspan=2, padx=20, pady=5, sticky="we")
 
         # --- Action Buttons ---
         btn_f = ttk.Frame(self.tab_dxt)
@@ -1129,7 +1354,7 @@ class BZReduxSuite:
         ttk.Button(btn_f, text="+ Convert Single .dxtbz2", style="Action.TButton", command=self.ui_single_dxt).pack(side="left", padx=10)
         ttk.Button(btn_f, text="+ Batch Folder", style="Action.TButton", command=self.ui_batch_dxt).pack(side="left", padx=10)
 
-        self.dxt_log = tk.Text(self.tab_dxt, height=20, bg="#050505", fg=BZ_FG, font=("Consolas", 9))
+        self.dxt_log = self.make_log(self.tab_dxt, 20)
         self.dxt_log.pack(padx=20, pady=10, fill="both")
 
     def update_dxt_ui_state(self, *args):
@@ -1140,72 +1365,18 @@ class BZReduxSuite:
             self.dxt_compress_combo.configure(state="disabled")
             self.dxt_mips_chk.configure(state="disabled")
 
-    def process_dxtbz2(self, path):
-        """Converts dxtbz2 to a temp DDS, then uses internal_save_img for final compression/format"""
-        base_name = os.path.basename(path)
-        file_no_ext = os.path.splitext(base_name)[0]
-        out_ext = self.dxt_out_ext.get()
-        final_out = os.path.join(os.path.dirname(path), file_no_ext + out_ext)
-
-        if os.path.exists(final_out) and not self.dxt_overwrite.get():
-            return f"Skipped: {file_no_ext}{out_ext} exists."
-
-        with open(path, "rb") as f:
-            header = DXTBZ2Header()
-            f.readinto(header)
-            
-            # Read chunk size for the first mip
-            size_raw = f.read(4)
-            if not size_raw: return "Error: Empty file"
-            chunk_size = struct.unpack("I", size_raw)[0]
-            
-            # Check for alpha based on data density
-            has_alpha = chunk_size // header.m_BaseHeight == header.m_BaseWidth
-            
-            # Extract raw DXT data
-            raw_data = f.read(chunk_size)
-            
-        # To use your existing PIL/texconv pipeline, we temporarily wrap this in a basic DDS
-        temp_dds = path + ".tmp.dds"
-        self.internal_wrap_dxt_to_dds(temp_dds, header, raw_data, has_alpha)
-
-        try:
-            # Open the wrapped DDS as a PIL image
-            with Image.open(temp_dds) as img:
-                # Use your existing texture processor logic for compression/mips/format
-                # Temporarily override UI variables to match this tab's settings
-                old_mips = self.tex_mips.get()
-                old_compress = self.tex_compress.get()
-                self.tex_mips.set(self.dxt_mips.get())
-                self.tex_compress.set(self.dxt_compress.get())
-                
-                self.internal_save_img(img, final_out, has_alpha)
-                
-                self.tex_mips.set(old_mips) # Restore global state
-                self.tex_compress.set(old_compress)
-        finally:
-            if os.path.exists(temp_dds): os.remove(temp_dds)
-
-        return f"Converted: {file_no_ext} -> {out_ext}"
-
-    def internal_wrap_dxt_to_dds(self, out_path, header, data, has_alpha):
-        """Minimal DDS wrapper to make raw DXT data readable by PIL"""
-        with open(out_path, "wb") as f:
-            f.write(b"DDS ")
-            # Basic Header
-            f.write(struct.pack("<IIIIIII 11I", 124, 0x1|0x2|0x4|0x1000, header.m_BaseHeight, header.m_BaseWidth, 0, 0, 1, *[0]*11))
-            # Pixel Format (DXT1 or DXT5)
-            fourcc = b"DXT5" if has_alpha else b"DXT1"
-            f.write(struct.pack("<II4sIIIII", 32, 0x4, fourcc, 0, 0, 0, 0, 0))
-            # Caps
-            f.write(struct.pack("<IIII I", 0x1000, 0, 0, 0, 0))
-            f.write(data)
+    def capture_dxt_options(self):
+        """Snapshot of the DXTBZ2 tab settings for one job (main thread only)."""
+        return DXTOptions(out_ext=self.dxt_out_ext.get(), overwrite=self.dxt_overwrite.get(),
+                          encode=EncodeOptions(compress=self.dxt_compress.get(), mips=self.dxt_mips.get(),
+                                               encoder=self.tex_encoder.get(), batch_texconv=self.tex_batch_texconv.get()))
 
     def ui_single_dxt(self):
         path = filedialog.askopenfilename(filetypes=[("Legacy Texture", "*.dxtbz2")])
         if not path: return
         try:
-            msg = self.process_dxtbz2(path)
+            msg = engine.process_dxtbz2(path, self.capture_dxt_options(),
+                                        log=lambda m: self.log_msg(self.dxt_log, m))
             self.log_msg(self.dxt_log, msg)
         except Exception as e:
             self.log_msg(self.dxt_log, f"ERROR: {e}")
@@ -1213,17 +1384,37 @@ class BZReduxSuite:
     def ui_batch_dxt(self):
         folder = filedialog.askdirectory()
         if not folder: return
+        opts = self.capture_dxt_options()
+        incremental = self.incremental.get()
+        discovery = self.capture_discovery()
+        log = self.threaded_log(self.dxt_log)
         
-        def run_batch():
-            files = [f for f in os.listdir(folder) if f.lower().endswith(".dxtbz2")]
-            for f in files:
-                try:
-                    msg = self.process_dxtbz2(os.path.join(folder, f))
-                    self.root.after(0, lambda m=msg: self.log_msg(self.dxt_log, m))
-                except: pass
-            self.root.after(0, lambda: self.log_msg(self.dxt_log, "Batch Finished."))
+        def run_batch(job):
+            paths = self.iter_batch_sources(folder, (".dxtbz2",), discovery)
+            outputs_for = lambda p: engine.dxtbz2_outputs(p, opts)
+            cache, fingerprint, paths, run_opts = self.open_build_cache(incremental, "dxtbz2", paths, opts, outputs_for)
+            paths = self.counted(job, paths)
+            built = []
+            with self.open_trace(job, log) as tracer:
+                failed = []
+                with engine.traced(job.trace) as flush_stages, engine.texconv_batch(run_opts.encode, log, failed) as encode:
+                    batch_opts = replace(run_opts, encode=encode)
+                    for res in engine.iter_batch(engine.process_dxtbz2, paths, batch_opts, control=job.control, trace=job.trace):
+                        job.meter.add(res.path)
+                        if tracer: tracer.add(res.path, res.stages)
+                        for note in res.notes:
+                            log(note)
+                        if res.error is None:
+                            built.append(res.path)
+                            log(res.msg)
+                        else:
+                            log(f"Skip {os.path.basename(res.path)}: {res.error}")
+                self.drop_failed_outputs(built, failed, outputs_for, log)
+                self.close_build_cache(cache, "dxtbz2", fingerprint, built, outputs_for, log)
+                if tracer: tracer.add("(texconv batch)", flush_stages)
+            log("Batch Cancelled." if job.control.cancelled else "Batch Finished.")
             
-        threading.Thread(target=run_batch, daemon=True).start()
+        self.jobs.submit("DXTBZ2 batch", run_batch, trace=self.batch_trace.get(), log=log)
         
     def setup_pack_tab(self):
         ttk.Label(self.tab_pack, text="Channel Packer (Alpha Injector)", font=(self.custom_font_name, 16, "bold"), foreground=BZ_GREEN).pack(pady=10)
@@ -1258,7 +1449,7 @@ class BZReduxSuite:
         
         ttk.Button(f, text="MERGE & SAVE", style="Success.TButton", command=self.process_pack).pack(fill="x", pady=10)
         
-        self.pack_log = tk.Text(f, height=10, bg="#050505", fg=BZ_FG, font=("Consolas", 9))
+        self.pack_log = self.make_log(f, 10)
         self.pack_log.pack(fill="both", expand=True)
 
     def process_pack(self):
@@ -1271,20 +1462,15 @@ class BZReduxSuite:
             return
             
         try:
-            rgb_img = Image.open(rgb_p).convert("RGB")
-            alpha_img = Image.open(a_p).convert("L")
-            
-            if rgb_img.size != alpha_img.size:
-                self.log_msg(self.pack_log, f"Resizing Alpha {alpha_img.size} to match RGB {rgb_img.size}...")
-                alpha_img = alpha_img.resize(rgb_img.size, Image.Resampling.LANCZOS)
-                
-            rgb_img.putalpha(alpha_img)
-            rgb_img.save(out_p)
-            self.log_msg(self.pack_log, f"Success: Saved RGBA to {out_p}")
+            msg = engine.pack_channels(rgb_p, a_p, out_p, log=lambda m: self.log_msg(self.pack_log, m))
+            self.log_msg(self.pack_log, msg)
         except Exception as e:
             self.log_msg(self.pack_log, f"Error: {e}")
 
 if __name__ == "__main__":
+    # Needed for the batch process pool in frozen (PyInstaller) builds
+    import multiprocessing
+    multiprocessing.freeze_support()
     root = TkinterDnD.Tk() if HAS_DND else tk.Tk()
     app = BZReduxSuite(root)
     root.mainloop()